@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""Benchmark the PDF and QR generators and catch regressions.
+
+Runs each scenario in-process N times and records wall time (median),
+peak Python memory (tracemalloc, from a separate warm-up run) and bytes
+written.  Batch scenarios at 1, 100 and 1000 documents show how things
+scale.  Run from the repo root:
+
+    python scripts/bench.py                                # all quick scenarios
+    python scripts/bench.py --batch                        # plus the batch scenarios
+    python scripts/bench.py --save-baseline bench.json     # record a baseline
+    python scripts/bench.py --baseline bench.json          # exit 1 on regressions
+
+Process-pool batches only count the parent's memory; their workers are
+separate processes.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import gen_application
+import gen_financial_aid_form
+import gen_flier
+import gen_qr_code
+
+BATCH_SIZES = (1, 100, 1000)
+
+# allowed relative increase per metric before it counts as a regression
+THRESHOLDS = {"seconds": 0.5, "peak_bytes": 0.25, "output_bytes": 0.10}
+
+
+def dir_bytes(path):
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+
+def application(tmp):
+    path = os.path.join(tmp, "application.pdf")
+    gen_application.create_application_form(path)
+    return 1, os.path.getsize(path)
+
+
+def financial_aid(tmp):
+    path = os.path.join(tmp, "financial_aid.pdf")
+    gen_financial_aid_form.main(path)
+    return 1, os.path.getsize(path)
+
+
+def flier(tmp):
+    path = os.path.join(tmp, "flier.pdf")
+    gen_flier.create_application_form(path)
+    return 1, os.path.getsize(path)
+
+
+def qr(tmp):
+    path = os.path.join(tmp, "qr.png")
+    gen_qr_code.render_qr(gen_qr_code.site_url, path)
+    return 1, os.path.getsize(path)
+
+
+def application_batch(n):
+    def run(tmp):
+        roster = os.path.join(tmp, "roster.json")
+        with open(roster, "w") as f:
+            json.dump([
+                {"fullname_field": f"Scholar {i}", "email_field": f"scholar{i}@example.org",
+                 "program_field": "Example University NNP", "fulltime_field": "yes"}
+                for i in range(n)
+            ], f)
+        out = os.path.join(tmp, "renewals")
+        count = gen_application.create_application_batch(roster, out)
+        return count, dir_bytes(out)
+    return run
+
+
+def qr_batch(n):
+    def run(tmp):
+        targets = [(f"campus-{i}", gen_qr_code.tracked_url(f"campus-{i}", "bench")) for i in range(n)]
+        out = os.path.join(tmp, "qr")
+        # a fresh cache each run, so every code is really rendered
+        cache_dir, gen_qr_code.cache_dir = gen_qr_code.cache_dir, os.path.join(tmp, "cache")
+        try:
+            gen_qr_code.generate_batch(targets, out, formats=("png",))
+        finally:
+            gen_qr_code.cache_dir = cache_dir
+        return n, dir_bytes(out) - os.path.getsize(os.path.join(out, "manifest.json"))
+    return run
+
+
+SCENARIOS = {
+    "application": application,
+    "financial_aid": financial_aid,
+    "flier": flier,
+    "qr": qr,
+}
+BATCH_SCENARIOS = {
+    **{f"application_batch_{n}": application_batch(n) for n in BATCH_SIZES},
+    **{f"qr_batch_{n}": qr_batch(n) for n in BATCH_SIZES},
+}
+
+
+def measure(fn, repeat):
+    """Run fn(tmpdir) and return the scenario's metrics.
+
+    The first run is traced for peak memory and doubles as a warm-up; the
+    next `repeat` runs are timed without tracemalloc's overhead.  With
+    repeat=0 (batches) the traced run's own time is reported.
+    """
+    times = []
+    for i in range(repeat + 1):
+        traced = i == 0
+        with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+            if traced:
+                tracemalloc.start()
+            start = time.perf_counter()
+            docs, output = fn(tmp)
+            elapsed = time.perf_counter() - start
+            if traced:
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+        if not traced or repeat == 0:
+            times.append(elapsed)
+    seconds = statistics.median(times)
+    return {
+        "docs": docs,
+        "runs": len(times),
+        "seconds": seconds,
+        "seconds_per_doc": seconds / docs if docs else None,
+        "peak_bytes": peak,
+        "output_bytes": output,
+    }
+
+
+def compare(results, baseline, thresholds):
+    """List a message per metric that grew past its threshold versus the baseline."""
+    regressions = []
+    for name, metrics in results.items():
+        old = baseline.get(name)
+        if not old:
+            continue
+        for metric, limit in thresholds.items():
+            before, after = old.get(metric), metrics.get(metric)
+            if before and after is not None and after > before * (1 + limit):
+                regressions.append(f"{name}.{metric}: {before:,.4g} -> {after:,.4g} "
+                                   f"(+{after / before - 1:.0%}, limit +{limit:.0%})")
+    return regressions
+
+
+def print_table(results):
+    print(f"{'scenario':<24}{'docs':>6}{'median s':>11}{'ms/doc':>9}{'peak MiB':>10}{'output KiB':>12}")
+    for name, m in results.items():
+        per_doc = f"{m['seconds_per_doc'] * 1000:.1f}" if m["seconds_per_doc"] else "-"
+        print(f"{name:<24}{m['docs']:>6}{m['seconds']:>11.3f}{per_doc:>9}"
+              f"{m['peak_bytes'] / 2**20:>10.1f}{m['output_bytes'] / 1024:>12.1f}")
+
+
+def parse_threshold(text):
+    metric, _, ratio = text.partition("=")
+    if metric not in THRESHOLDS:
+        raise argparse.ArgumentTypeError(f"unknown metric {metric!r}; one of {', '.join(THRESHOLDS)}")
+    return metric, float(ratio)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the PDF and QR generators.")
+    parser.add_argument("scenarios", nargs="*", help="scenarios to run (default: all selected)")
+    parser.add_argument("--batch", action="store_true", help="include the 1/100/1000-document batch scenarios")
+    parser.add_argument("--repeat", "-n", type=int, default=5, help="runs per quick scenario (default: %(default)s)")
+    parser.add_argument("--output", help="write results as JSON here")
+    parser.add_argument("--baseline", help="compare against this results JSON and exit 1 on regressions")
+    parser.add_argument("--save-baseline", metavar="PATH", help="write the results as the new baseline")
+    parser.add_argument("--threshold", action="append", type=parse_threshold, default=[],
+                        help="METRIC=RATIO allowed increase, e.g. seconds=0.3 "
+                             f"(defaults: {', '.join(f'{k}={v}' for k, v in THRESHOLDS.items())})")
+    args = parser.parse_args()
+
+    available = {**SCENARIOS, **BATCH_SCENARIOS}
+    names = args.scenarios or list(SCENARIOS) + (list(BATCH_SCENARIOS) if args.batch else [])
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}; choose from {', '.join(available)}")
+
+    results = {}
+    for name in names:
+        # batches are slow and already average over many documents
+        repeat = 0 if name in BATCH_SCENARIOS else args.repeat
+        print(f"Running {name}...", file=sys.stderr)
+        results[name] = measure(available[name], repeat)
+    print_table(results)
+
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "scenarios": results,
+    }
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        print("Wrote", path)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["scenarios"]
+        regressions = compare(results, baseline, {**THRESHOLDS, **dict(args.threshold)})
+        for line in regressions:
+            print("REGRESSION", line, file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""Incremental, parallel build of every generated artifact.
+
+    python scripts/build.py              rebuild whatever is stale
+    python scripts/build.py forms/flier.pdf --force
+    python scripts/build.py --dry-run    list what would be rebuilt
+
+Each target's fingerprint covers its generator script and the local modules
+it imports, the image files its layout draws, any other target it consumes
+(the flier embeds img/qr.png) and the build options.  A target is rebuilt
+only when that fingerprint differs from the last successful build, recorded
+in .cache/build.json, or its output is missing.  Targets that don't depend
+on each other build in parallel; dependents wait for their inputs.
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+
+import pymupdf
+
+from pdf_save import DEFAULT_PROFILE, PROFILES
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = os.path.join(ROOT, "scripts")
+STATE_FILE = ".cache/build.json"
+
+
+# --------------------
+# Builders (run in worker processes, from the repo root)
+# --------------------
+
+def build_qr(output, profile):
+    import gen_qr_code
+    gen_qr_code.render_qr(gen_qr_code.site_url, output)
+
+
+def build_application(output, profile):
+    import gen_application
+    gen_application.create_application_form(output, profile)
+
+
+def build_financial_aid(output, profile):
+    import gen_financial_aid_form
+    gen_financial_aid_form.main(output, profile)
+
+
+def build_flier(output, profile):
+    import gen_flier
+    gen_flier.create_application_form(output, profile)
+
+
+# --------------------
+# Dependency graph
+# --------------------
+
+def application_images():
+    import gen_application
+    from form_layout import compile_layout, layout_images
+    return layout_images(compile_layout(gen_application.application_form))
+
+
+def financial_aid_images():
+    import gen_financial_aid_form
+    from form_layout import compile_layout, layout_images
+    return layout_images(compile_layout(gen_financial_aid_form.financial_aid_form))
+
+
+def flier_images():
+    import gen_flier
+    from form_layout import compile_layout, layout_images
+    return layout_images(compile_layout(gen_flier.flier_spec(), gen_flier.page_width, gen_flier.page_height))
+
+
+@dataclass
+class Target:
+    output: str
+    script: str
+    builder: object
+    images: object = None  # callable returning the image files the output embeds
+    pdf: bool = True  # takes the save profile
+    inputs: list = field(default_factory=list)
+
+
+TARGETS = {t.output: t for t in [
+    Target("img/qr.png", "gen_qr_code", build_qr, pdf=False),
+    Target("forms/application_form_v1.pdf", "gen_application", build_application, application_images),
+    Target("forms/financial_aid_certification_v1.pdf", "gen_financial_aid_form", build_financial_aid, financial_aid_images),
+    Target("forms/flier.pdf", "gen_flier", build_flier, flier_images),
+]}
+
+
+def local_imports(module, seen=None):
+    """Source files of `module` and every scripts/ module it imports, recursively."""
+    seen = set() if seen is None else seen
+    path = os.path.join("scripts", f"{module}.py")
+    if path in seen or not os.path.exists(path):
+        return seen
+    seen.add(path)
+    with open(path) as f:
+        tree = ast.parse(f.read(), path)
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names = [node.module]
+        else:
+            continue
+        for name in names:
+            local_imports(name.split(".")[0], seen)
+    return seen
+
+
+def resolve_inputs(targets):
+    """Fill in each target's input files; raises on a dependency cycle."""
+    for target in targets.values():
+        files = set(local_imports(target.script))
+        if target.images:
+            files.update(target.images())
+        target.inputs = sorted(files)
+    order, visiting = [], set()
+
+    def visit(name):
+        if name in order:
+            return
+        if name in visiting:
+            raise ValueError(f"dependency cycle through {name}")
+        visiting.add(name)
+        for dep in deps(targets, name):
+            visit(dep)
+        visiting.discard(name)
+        order.append(name)
+
+    for name in targets:
+        visit(name)
+    return order
+
+
+def deps(targets, name):
+    return [path for path in targets[name].inputs if path in targets and path != name]
+
+
+# --------------------
+# Fingerprints
+# --------------------
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def fingerprint(target, options):
+    h = hashlib.sha256(json.dumps(options, sort_keys=True).encode())
+    for path in target.inputs:
+        h.update(f"{path}\0{file_sha256(path)}\n".encode())
+    return h.hexdigest()
+
+
+def load_state(path=STATE_FILE):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(state, path=STATE_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def target_options(target, profile):
+    options = {"pymupdf": pymupdf.VersionBind}
+    if target.pdf:
+        options["profile"] = profile
+    return options
+
+
+def is_stale(target, state, options, force=False):
+    if force or not os.path.exists(target.output):
+        return True
+    return state.get(target.output, {}).get("fingerprint") != fingerprint(target, options)
+
+
+# --------------------
+# Scheduler
+# --------------------
+
+def _run_target(builder, output, profile):
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    builder(output, profile)
+    return output
+
+
+def build(names=None, force=False, jobs=None, profile=DEFAULT_PROFILE, dry_run=False):
+    """Rebuild the stale targets among names (default: all) and what they depend on.
+
+    Returns (built, up_to_date, failed) lists of outputs.
+    """
+    order = resolve_inputs(TARGETS)
+    wanted = set()
+
+    def want(name):
+        if name not in wanted:
+            wanted.add(name)
+            for dep in deps(TARGETS, name):
+                want(dep)
+
+    for name in names or TARGETS:
+        want(name)
+    order = [name for name in order if name in wanted]
+
+    state = load_state()
+    if dry_run:
+        # a target is stale too if one of its inputs is about to be rebuilt
+        stale = []
+        for name in order:
+            target = TARGETS[name]
+            if is_stale(target, state, target_options(target, profile), force) or any(d in stale for d in deps(TARGETS, name)):
+                stale.append(name)
+        return stale, [name for name in order if name not in stale], []
+
+    built, fresh, failed = [], [], []
+    done = set()
+    pending = list(order)
+    running = {}
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        while pending or running:
+            for name in list(pending):
+                target_deps = deps(TARGETS, name)
+                if any(dep in failed for dep in target_deps):
+                    pending.remove(name)
+                    failed.append(name)
+                    print(f"Skipped {name}: a dependency failed", file=sys.stderr)
+                    continue
+                if not all(dep in done for dep in target_deps):
+                    continue
+                pending.remove(name)
+                target = TARGETS[name]
+                options = target_options(target, profile)
+                if not is_stale(target, state, options, force):
+                    fresh.append(name)
+                    done.add(name)
+                    continue
+                # the fingerprint is taken before building, so an input edited
+                # mid-build leaves the target stale for the next run
+                future = pool.submit(_run_target, target.builder, target.output, profile)
+                running[future] = (name, fingerprint(target, options))
+                print("Building", name)
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name, fp = running.pop(future)
+                try:
+                    future.result()
+                except Exception as e:
+                    failed.append(name)
+                    print(f"Failed {name}: {e}", file=sys.stderr)
+                    continue
+                state[name] = {"fingerprint": fp, "output_sha256": file_sha256(name)}
+                save_state(state)
+                built.append(name)
+                done.add(name)
+    return built, fresh, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the generated forms, flier and QR code.")
+    parser.add_argument("targets", nargs="*", help="outputs to build (default: all)")
+    parser.add_argument("--force", action="store_true", help="rebuild even if up to date")
+    parser.add_argument("--jobs", "-j", type=int, help="parallel builds (default: one per CPU)")
+    parser.add_argument("--profile", default=DEFAULT_PROFILE, choices=sorted(PROFILES),
+                        help="PDF save profile (default: %(default)s)")
+    parser.add_argument("--dry-run", "-n", action="store_true", help="only list what would be rebuilt")
+    parser.add_argument("--list", action="store_true", help="list targets and their inputs")
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    unknown = [name for name in args.targets if name not in TARGETS]
+    if unknown:
+        parser.error(f"unknown target(s): {', '.join(unknown)}; choose from {', '.join(TARGETS)}")
+
+    if args.list:
+        resolve_inputs(TARGETS)
+        for name, target in TARGETS.items():
+            print(name)
+            for path in target.inputs:
+                print("   ", path)
+        return
+
+    built, fresh, failed = build(args.targets, args.force, args.jobs, args.profile, args.dry_run)
+    if args.dry_run:
+        for name in built:
+            print("Stale", name)
+        print(f"{len(built)} stale, {len(fresh)} up to date")
+        return
+    print(f"Built {len(built)}, {len(fresh)} up to date, {len(failed)} failed")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""Concurrent, rate-limited email delivery for cadence reminders.
+
+Messages are Resend-style dicts ({"from", "to", "subject", "html"}) and go
+out through a mailer: ResendMailer in production, or SmtpMailer pointed at a
+local stand-in (e.g. `python -m aiosmtpd -n -l localhost:1025`) for testing.
+ResendMailer sends a whole batch in one idempotent request; SMTP has no
+idempotency key and no all-or-nothing batch, so SmtpMailer takes one
+message per batch and a failed send never repeats the ones before it.
+"""
+
+import random
+import smtplib
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.message import EmailMessage
+
+
+class ResendMailer:
+    """Talks to the Resend HTTP API over one reused session."""
+
+    api = "https://api.resend.com"
+    max_batch = 100  # Resend's limit per batch request
+
+    def __init__(self, api_key: str, session=None):
+        if session is None:
+            import requests
+
+            session = requests.Session()
+        self.session = session
+        self.session.headers["Authorization"] = f"Bearer {api_key}"
+
+    def _post(self, path: str, payload, idempotency_key: str | None):
+        headers = {"Idempotency-Key": idempotency_key} if idempotency_key else {}
+        r = self.session.post(f"{self.api}{path}", json=payload, headers=headers, timeout=30)
+        r.raise_for_status()
+        return r.json()
+
+    def send(self, message: dict, idempotency_key: str | None = None):
+        self._post("/emails", message, idempotency_key)
+
+    def send_batch(self, messages: list[dict], idempotency_key: str | None = None):
+        self._post("/emails/batch", messages, idempotency_key)
+
+
+class SmtpMailer:
+    max_batch = 1  # each message is sent, and its outcome recorded, on its own
+
+    def __init__(self, host: str = "localhost", port: int = 1025):
+        self.host = host
+        self.port = port
+
+    def send(self, message: dict, idempotency_key: str | None = None):
+        self.send_batch([message])
+
+    def send_batch(self, messages: list[dict], idempotency_key: str | None = None):
+        if len(messages) > self.max_batch:
+            raise ValueError(f"SmtpMailer sends {self.max_batch} message per batch, got {len(messages)}")
+        with smtplib.SMTP(self.host, self.port, timeout=30) as smtp:
+            for message in messages:
+                smtp.send_message(_email_message(message))
+
+
+def _email_message(message: dict) -> EmailMessage:
+    msg = EmailMessage()
+    msg["From"] = message["from"]
+    to = message["to"]
+    msg["To"] = ", ".join(to) if isinstance(to, list) else to
+    msg["Subject"] = message["subject"]
+    msg.set_content(message["html"], subtype="html")
+    return msg
+
+
+class RateLimiter:
+    """Spaces calls at least 1/per_second apart across all threads."""
+
+    def __init__(self, per_second: float):
+        self.interval = 1.0 / per_second
+        self.lock = threading.Lock()
+        self.next_at = 0.0
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            at = max(now, self.next_at)
+            self.next_at = at + self.interval
+        if at > now:
+            time.sleep(at - now)
+
+
+def call_with_retry(fn, item, limiter: RateLimiter, retries: int = 3, backoff: float = 1.0) -> int:
+    """Call fn(item), retrying with exponential backoff and jitter.
+
+    Returns the number of attempts made; re-raises the last error.
+    """
+    for attempt in range(retries + 1):
+        limiter.wait()
+        try:
+            fn(item)
+            return attempt + 1
+        except Exception as e:
+            if attempt == retries:
+                raise
+            delay = backoff * 2 ** attempt * (1 + random.random() / 2)
+            print(f"Send failed ({e}); retrying in {delay:.1f}s", file=sys.stderr)
+            time.sleep(delay)
+
+
+def run_all(fn, items: list, max_workers: int = 4, per_second: float = 2.0,
+            retries: int = 3, backoff: float = 1.0) -> list[tuple[int, Exception | None]]:
+    """Call fn on every item concurrently; return (attempts, error or None) per item, in order.
+
+    One failure never stops the other calls.
+    """
+    limiter = RateLimiter(per_second)
+
+    def deliver(item):
+        try:
+            return call_with_retry(fn, item, limiter, retries, backoff), None
+        except Exception as e:
+            return retries + 1, e
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(deliver, items))
+
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""Durable SQLite outbox for cadence reminder emails.
+
+Each reminder is one row keyed by (task, day, recipient), so queueing the
+same reminder twice -- a rerun, a manual workflow_dispatch -- is a no-op.
+flush() groups pending rows into one digest per (recipient, day, org), sends the
+digests in batches over the mailer's reused connection, and records the
+outcome.  Each batch carries an idempotency key derived from its rows, so
+even a rerun on a machine without the outbox file doesn't send twice.
+
+A flush that fails counts as one attempt, however many times the mailer
+retried within it, and the row waits an exponentially growing delay (1, 2,
+4, ... minutes) before the next flush picks it up again.  With the default
+10 attempts a reminder keeps retrying for about eight and a half hours
+before it is marked failed, so a provider outage doesn't drop it.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+from datetime import date, datetime, timedelta, timezone
+
+from cadence_mail import run_all
+
+
+class Outbox:
+    def __init__(self, path: str, max_attempts: int = 10, backoff: float = 60.0):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.max_attempts = max_attempts
+        self.backoff = backoff  # seconds before the first retry; doubles with each failed flush
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                task TEXT NOT NULL,
+                day TEXT NOT NULL,
+                recipient TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'queued',  -- queued | sent | failed
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                queued_at TEXT NOT NULL,
+                sent_at TEXT,
+                next_attempt_at TEXT,  -- a failed row isn't retried before this
+                PRIMARY KEY (task, day, recipient)
+            )
+        """)
+        columns = {row[1] for row in self.db.execute("PRAGMA table_info(outbox)")}
+        if "next_attempt_at" not in columns:  # outbox created before retries were spaced out
+            self.db.execute("ALTER TABLE outbox ADD COLUMN next_attempt_at TEXT")
+        self.db.commit()
+
+    def enqueue(self, task: str, day: date, recipient: str, payload: dict) -> bool:
+        """Queue a reminder; returns False if (task, day, recipient) was already queued or sent."""
+        cur = self.db.execute(
+            "INSERT OR IGNORE INTO outbox (task, day, recipient, payload, queued_at) VALUES (?, ?, ?, ?, ?)",
+            (task, day.isoformat(), recipient, json.dumps(payload), _now()),
+        )
+        self.db.commit()
+        return cur.rowcount == 1
+
+    def pending(self) -> int:
+        """Queued rows that are due to be sent now (not waiting out a retry delay)."""
+        return self.db.execute(
+            "SELECT COUNT(*) FROM outbox WHERE status = 'queued' AND COALESCE(next_attempt_at, '') <= ?", (_now(),)
+        ).fetchone()[0]
+
+    def stats(self) -> dict[str, int]:
+        """Counters: queued (waiting), sent, failed (gave up) and retried (extra attempts)."""
+        counts = dict(self.db.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+        retried = self.db.execute("SELECT COALESCE(SUM(attempts - 1), 0) FROM outbox WHERE attempts > 1").fetchone()[0]
+        return {
+            "queued": counts.get("queued", 0),
+            "sent": counts.get("sent", 0),
+            "retried": retried,
+            "failed": counts.get("failed", 0),
+        }
+
+    def flush(self, mailer, compose, max_workers: int = 4, per_second: float = 2.0, retries: int = 3) -> dict[str, int]:
+        """Send everything queued and due; compose(recipient, day, payloads) builds each digest message.
+
+        Returns stats() afterwards.
+        """
+        rows = self.db.execute(
+            "SELECT task, day, recipient, payload FROM outbox "
+            "WHERE status = 'queued' AND COALESCE(next_attempt_at, '') <= ? ORDER BY day, recipient, queued_at",
+            (_now(),),
+        ).fetchall()
+        digests: dict[tuple[str, str, str], list] = {}
+        for task, day, recipient, payload in rows:
+            payload = json.loads(payload)
+            digests.setdefault((recipient, day, payload.get("org", "")), []).append((task, payload))
+        if not digests:
+            return self.stats()
+
+        items = list(digests.items())
+        batches = [items[i:i + mailer.max_batch] for i in range(0, len(items), mailer.max_batch)]
+
+        def send(batch):
+            messages = [
+                compose(recipient, date.fromisoformat(day), [payload for _, payload in entries])
+                for (recipient, day, _), entries in batch
+            ]
+            mailer.send_batch(messages, idempotency_key=_batch_key(batch))
+
+        results = run_all(send, batches, max_workers=max_workers, per_second=per_second, retries=retries)
+        for batch, (_, error) in zip(batches, results):
+            for (recipient, day, _), entries in batch:
+                for task, _ in entries:
+                    self._record(task, day, recipient, error)
+        self.db.commit()
+        return self.stats()
+
+    def _record(self, task, day, recipient, error):
+        """One attempt per flush; the mailer's own quick retries within it don't count."""
+        key = (task, day, recipient)
+        if error is None:
+            self.db.execute(
+                "UPDATE outbox SET status = 'sent', attempts = attempts + 1, sent_at = ?, last_error = NULL, "
+                "next_attempt_at = NULL WHERE task = ? AND day = ? AND recipient = ?",
+                (_now(), *key),
+            )
+            return
+        attempts = self.db.execute(
+            "SELECT attempts FROM outbox WHERE task = ? AND day = ? AND recipient = ?", key
+        ).fetchone()[0] + 1
+        retry_at = datetime.now(timezone.utc) + timedelta(seconds=self.backoff * 2 ** (attempts - 1))
+        self.db.execute(
+            "UPDATE outbox SET attempts = ?, last_error = ?, next_attempt_at = ?, status = ? "
+            "WHERE task = ? AND day = ? AND recipient = ?",
+            (attempts, str(error), retry_at.isoformat(), "failed" if attempts >= self.max_attempts else "queued", *key),
+        )
+
+
+def _batch_key(batch) -> str:
+    keys = sorted(f"{task}|{day}|{recipient}" for (recipient, day, _), entries in batch for task, _ in entries)
+    return hashlib.sha256("\n".join(keys).encode()).hexdigest()
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""Recurrence rules for the When: field of cadence.md.
+
+Supported forms (case-insensitive):
+
+    March 1                      every year on that date
+    March 1 2027                 once
+    first Monday of March        first/second/third/fourth/fifth/last <weekday> of <month>
+    every 2 weeks from Jan 1     every N days/weeks, restarting at the anchor each year
+    every 10 days from Jan 1 2027    ... or running on from a dated anchor
+    15 days before April 15      N days/weeks before/after any annual rule
+
+parse_rule() compiles a When: string once into a rule object whose
+occurrences() / next_occurrence() are computed arithmetically, year by year
+or step by step, never by walking the calendar a day at a time.
+"""
+
+import calendar
+import re
+from abc import ABC, abstractmethod
+from datetime import date, timedelta
+
+_MONTHS = {name.lower(): i for i, name in enumerate(calendar.month_name) if name}
+_MONTHS.update({name.lower(): i for i, name in enumerate(calendar.month_abbr) if name})
+_MONTHS["sept"] = 9
+_WEEKDAYS = {name.lower(): i for i, name in enumerate(calendar.day_name)}
+_WEEKDAYS.update({name.lower(): i for i, name in enumerate(calendar.day_abbr)})
+_ORDINALS = {
+    "first": 1, "1st": 1, "second": 2, "2nd": 2, "third": 3, "3rd": 3,
+    "fourth": 4, "4th": 4, "fifth": 5, "5th": 5, "last": -1,
+}
+_UNITS = {"day": 1, "week": 7}
+
+DATE_RE = re.compile(r"^(?P<month>[a-z]+)\.?\s+(?P<day>\d{1,2})(?:st|nd|rd|th)?(?:,?\s+(?P<year>\d{4}))?$")
+NTH_RE = re.compile(r"^(?P<nth>[a-z0-9]+)\s+(?P<weekday>[a-z]+)\s+(?:of|in)\s+(?P<month>[a-z]+)$")
+EVERY_RE = re.compile(r"^every\s+(?:(?P<n>\d+)\s+)?(?P<unit>day|week)s?\s+(?:from|starting)\s+(?P<anchor>.+)$")
+OFFSET_RE = re.compile(r"^(?P<n>\d+)\s+(?P<unit>day|week)s?\s+(?P<direction>before|after)\s+(?P<base>.+)$")
+
+
+class AnnualRule(ABC):
+    """A rule that fires at most once per yearly cycle; subclasses implement in_year()."""
+
+    spill = 1  # how many years a cycle's date may land away from its own year
+
+    @abstractmethod
+    def in_year(self, year: int) -> date | None:
+        """The cycle's occurrence for `year`, or None if it has none that year."""
+
+    def occurrences(self, start: date, end: date) -> list[date]:
+        """Every occurrence between start and end, inclusive, in order."""
+        found = (self.in_year(year) for year in range(start.year - self.spill, end.year + self.spill + 1))
+        return sorted(d for d in found if d and start <= d <= end)
+
+    def next_occurrence(self, after: date) -> date | None:
+        """The first occurrence on or after `after`."""
+        # Feb 29 can be up to 8 years away
+        found = (self.in_year(year) for year in range(after.year - self.spill, after.year + self.spill + 9))
+        return min((d for d in found if d and d >= after), default=None)
+
+
+class AnnualDate(AnnualRule):
+    def __init__(self, month: int, day: int):
+        date(2000, month, day)  # validates, allowing Feb 29
+        self.month, self.day = month, day
+
+    def in_year(self, year):
+        try:
+            return date(year, self.month, self.day)
+        except ValueError:  # Feb 29 outside a leap year
+            return None
+
+    def __repr__(self):
+        return f"AnnualDate({calendar.month_name[self.month]} {self.day})"
+
+
+class NthWeekday(AnnualRule):
+    def __init__(self, n: int, weekday: int, month: int):
+        self.n, self.weekday, self.month = n, weekday, month
+
+    def in_year(self, year):
+        if self.n < 0:
+            last = date(year, self.month, calendar.monthrange(year, self.month)[1])
+            return last - timedelta(days=(last.weekday() - self.weekday) % 7)
+        first = date(year, self.month, 1)
+        d = first + timedelta(days=(self.weekday - first.weekday()) % 7 + 7 * (self.n - 1))
+        return d if d.month == self.month else None
+
+    def __repr__(self):
+        return f"NthWeekday({self.n}, {calendar.day_name[self.weekday]}, {calendar.month_name[self.month]})"
+
+
+class Offset(AnnualRule):
+    def __init__(self, days: int, base: AnnualRule):
+        self.delta = timedelta(days=days)
+        self.base = base
+        self.spill = base.spill + abs(days) // 365 + 1
+
+    def in_year(self, year):
+        d = self.base.in_year(year)
+        return d + self.delta if d else None
+
+    def __repr__(self):
+        return f"Offset({self.delta.days}, {self.base!r})"
+
+
+class OnceOn:
+    def __init__(self, when: date):
+        self.when = when
+
+    def occurrences(self, start, end):
+        return [self.when] if start <= self.when <= end else []
+
+    def next_occurrence(self, after):
+        return self.when if self.when >= after else None
+
+    def __repr__(self):
+        return f"OnceOn({self.when})"
+
+
+class Every:
+    """Every `step` days from an anchor; an anchor without a year restarts there each year."""
+
+    def __init__(self, step: int, month: int, day: int, year: int | None = None):
+        if step < 1:
+            raise ValueError("interval must be at least 1")
+        self.step = step
+        self.month, self.day, self.year = month, day, year
+        date(year or 2000, month, day)
+
+    def _runs(self, first_year: int, last_year: int):
+        """(first occurrence, last allowed date) of each run overlapping the years."""
+        if self.year is not None:
+            return [(date(self.year, self.month, self.day), date.max)]
+        runs = []
+        for year in range(first_year, last_year + 1):
+            try:
+                runs.append((date(year, self.month, self.day), date(year, 12, 31)))
+            except ValueError:
+                pass
+        return runs
+
+    def _first_on_or_after(self, anchor: date, lo: date) -> date:
+        k = -(-(lo - anchor).days // self.step)  # ceiling division
+        return anchor + timedelta(days=k * self.step)
+
+    def occurrences(self, start, end):
+        found = []
+        step = timedelta(days=self.step)
+        for anchor, last in self._runs(start.year, end.year):
+            lo, hi = max(start, anchor), min(end, last)
+            if lo > hi:
+                continue
+            d = self._first_on_or_after(anchor, lo)
+            while d <= hi:
+                found.append(d)
+                d += step
+        return found
+
+    def next_occurrence(self, after):
+        for anchor, last in self._runs(after.year, after.year + 8):
+            d = self._first_on_or_after(anchor, max(after, anchor))
+            if d <= last:
+                return d
+        return None
+
+    def __repr__(self):
+        anchor = f"{calendar.month_name[self.month]} {self.day}" + (f" {self.year}" if self.year else "")
+        return f"Every({self.step} days from {anchor})"
+
+
+def _parse_date(text: str) -> tuple[int, int, int | None]:
+    m = DATE_RE.match(text)
+    if not m or m.group("month") not in _MONTHS:
+        raise ValueError(f"not a date: {text!r}")
+    month, day = _MONTHS[m.group("month")], int(m.group("day"))
+    year = int(m.group("year")) if m.group("year") else None
+    date(year or 2000, month, day)  # validates the day of month
+    return month, day, year
+
+
+def parse_rule(text: str):
+    """Compile a When: string into a rule; raises ValueError if it can't be parsed."""
+    spec = " ".join(text.lower().split())
+
+    m = OFFSET_RE.match(spec)
+    if m:
+        base = parse_rule(m.group("base"))
+        if not isinstance(base, AnnualRule):
+            raise ValueError(f"can only offset a yearly rule: {text!r}")
+        days = int(m.group("n")) * _UNITS[m.group("unit")]
+        return Offset(-days if m.group("direction") == "before" else days, base)
+
+    m = EVERY_RE.match(spec)
+    if m:
+        month, day, year = _parse_date(m.group("anchor"))
+        return Every(int(m.group("n") or 1) * _UNITS[m.group("unit")], month, day, year)
+
+    m = NTH_RE.match(spec)
+    if m and m.group("nth") in _ORDINALS:
+        if m.group("weekday") not in _WEEKDAYS or m.group("month") not in _MONTHS:
+            raise ValueError(f"unknown weekday or month in {text!r}")
+        return NthWeekday(_ORDINALS[m.group("nth")], _WEEKDAYS[m.group("weekday")], _MONTHS[m.group("month")])
+
+    try:
+        month, day, year = _parse_date(spec)
+    except ValueError:
+        raise ValueError(f"unrecognized When: {text!r}") from None
+    return OnceOn(date(year, month, day)) if year else AnnualDate(month, day)
@@ -1,36 +1,163 @@
 #!/usr/bin/env python3
-"""Parse cadence.md and send email reminders for today's tasks."""
+"""Parse cadence.md and send email reminders for today's tasks.
 
+With --orgs, one run serves several funds or chapters: a directory of
+cadence files (each <name>.md next to its <name>.json settings, which may be
+just {}) or a JSON manifest mapping org names to settings:
+
+    {"chapter-east": {"cadence": "east.md", "timezone": "America/New_York",
+                      "recipient": "east@example.org", "sender": "...", "people": "east-people.json"}}
+
+Every org's schedule is indexed through one cache file, "today" is taken in
+each org's own timezone, and all reminders go through one outbox and one
+mail client.
+"""
+
+import argparse
+import hashlib
+import heapq
+import json
 import os
 import re
+import sqlite3
 import sys
-from datetime import datetime
-
-import resend
+import time as _time
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
-resend.api_key = os.environ["RESEND_API_KEY"]
+from cadence_mail import ResendMailer, SmtpMailer
+from cadence_outbox import Outbox
+from cadence_rules import parse_rule
 
 CADENCE_FILE = os.path.join(os.path.dirname(__file__), "..", "cadence.md")
+PEOPLE_FILE = os.path.join(os.path.dirname(__file__), "..", "people.json")
+INDEX_CACHE = os.path.join(os.path.dirname(__file__), "..", ".cache", "cadence_index.json")
+FIRED_DB = os.path.join(os.path.dirname(__file__), "..", ".cache", "cadence_fired.sqlite")
+OUTBOX_DB = os.path.join(os.path.dirname(__file__), "..", ".cache", "cadence_outbox.sqlite")
+
+SENDER = "ianrose@allisonrosememorialfund.org"
+DEFAULT_RECIPIENT = "ianrose14@gmail.com"  # gets anything whose Who: isn't in people.json
+CADENCE_URL = "https://github.com/ianrose14/scholarshipfund/blob/main/cadence.md"
+
+# --serve fires each reminder at its At: time (default below), in its own timezone
+TIMEZONE = "America/New_York"
+REMIND_AT = "9:00"
+
+TASK_RE = re.compile(r"^\* (.+)")
+FIELD_RE = re.compile(r"^\s+\* (\w+)(:?)\s+(.+)")
+FIELDS = ("when", "what", "who", "at")
+AT_RE = re.compile(r"^(\d{1,2})(?::(\d{2}))?\s*([ap]m)?(?:\s+(\S+))?$", re.IGNORECASE)
+
+
+@dataclass
+class Org:
+    """One fund or chapter: its cadence file and where its reminders go."""
+
+    name: str  # "" for the fund's own cadence.md, which keeps its historical outbox keys
+    cadence: str
+    timezone: str = TIMEZONE
+    recipient: str = DEFAULT_RECIPIENT
+    sender: str = SENDER
+    people: str | None = None  # people.json-style {name: email}
+    url: str | None = None  # link to the full cadence in each digest
+
+    @property
+    def label(self) -> str:
+        return self.name or os.path.basename(self.cadence)
+
+    def today(self, now: datetime | None = None) -> date:
+        return (now or datetime.now(timezone.utc)).astimezone(ZoneInfo(self.timezone)).date()
+
+
+DEFAULT_ORG = Org("", CADENCE_FILE, people=PEOPLE_FILE, url=CADENCE_URL)
+
+ORG_SETTINGS = {"cadence", "timezone", "recipient", "sender", "people", "url"}
+
+
+def load_orgs(path: str) -> list[Org]:
+    """Orgs from a directory of <name>.md cadence files or a JSON manifest of settings.
+
+    In a directory, an org is a <name>.md cadence file with a <name>.json
+    settings file beside it, so a README.md or notes aren't taken for orgs;
+    a shared people.json is used by orgs that don't name their own.
+    Relative paths are resolved against the directory or manifest.
+    """
+    if os.path.isdir(path):
+        base = path
+        manifest = {}
+        for name in sorted(os.listdir(path)):
+            stem, ext = os.path.splitext(name)
+            if ext != ".md" or not os.path.exists(os.path.join(path, f"{stem}.json")):
+                continue
+            with open(os.path.join(path, f"{stem}.json")) as f:
+                settings = json.load(f)
+            if not isinstance(settings, dict):
+                raise ValueError(f"org {stem!r}: {stem}.json must be a JSON object, not {type(settings).__name__}")
+            settings = {"cadence": name, **settings}
+            if "people" not in settings and os.path.exists(os.path.join(path, "people.json")):
+                settings["people"] = "people.json"
+            manifest[stem] = settings
+    else:
+        base = os.path.dirname(path)
+        with open(path) as f:
+            manifest = json.load(f)
+        if not isinstance(manifest, dict):
+            raise ValueError(f"{path}: expected a JSON object mapping org names to settings")
+
+    orgs = []
+    for name, settings in manifest.items():
+        if not isinstance(settings, dict):
+            raise ValueError(f"org {name!r}: settings must be a JSON object, not {type(settings).__name__}")
+        unknown = set(settings) - ORG_SETTINGS
+        if unknown or "cadence" not in settings:
+            raise ValueError(f"org {name!r}: needs 'cadence'; unknown settings {sorted(unknown)}")
+        settings = dict(settings)
+        for key in ("cadence", "people"):
+            if settings.get(key):
+                settings[key] = os.path.join(base, settings[key])
+        org = Org(name, **settings)
+        try:
+            ZoneInfo(org.timezone)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise ValueError(f"org {name!r}: unknown timezone {org.timezone!r}") from None
+        orgs.append(org)
+    if not orgs:
+        raise ValueError(f"no orgs in {path} (each needs <name>.md and <name>.json)")
+    return orgs
 
 
 def parse_cadence(path: str) -> list[dict]:
     """Return list of task dicts parsed from cadence.md."""
+    with open(path) as f:
+        return parse_cadence_lines(f)
+
+
+def parse_cadence_lines(lines, problems: list[str] | None = None) -> list[dict]:
+    """Parse task bullets; malformed sub-bullets are reported to `problems` if given."""
     tasks = []
     current: dict | None = None
+    problems = [] if problems is None else problems
 
-    with open(path) as f:
-        for line in f:
-            line = line.rstrip()
-            # Top-level bullet = task title
-            if re.match(r"^\* .+", line):
-                if current:
-                    tasks.append(current)
-                current = {"title": line[2:].strip()}
-            # Sub-bullet fields
-            elif current and re.match(r"^\s+\* (When|What|Who): .+", line):
-                m = re.match(r"^\s+\* (When|What|Who): (.+)", line)
-                if m:
-                    current[m.group(1).lower()] = m.group(2).strip()
+    for lineno, line in enumerate(lines, 1):
+        line = line.rstrip()
+        # Top-level bullet = task title
+        m = TASK_RE.match(line)
+        if m:
+            if current:
+                tasks.append(current)
+            current = {"title": m.group(1).strip(), "line": lineno}
+            continue
+        # Sub-bullet fields
+        m = FIELD_RE.match(line)
+        if current and m:
+            name, colon, value = m.groups()
+            if name.lower() not in FIELDS:
+                problems.append(f"line {lineno}: unrecognized sub-bullet {line.strip()!r}")
+                continue
+            if not colon:
+                problems.append(f"line {lineno}: missing ':' after {name}")
+            current[name.lower()] = value.strip()
 
     if current:
         tasks.append(current)
@@ -38,22 +165,188 @@ def parse_cadence(path: str) -> list[dict]:
     return tasks
 
 
-def tasks_for_today(tasks: list[dict]) -> list[dict]:
-    today = datetime.now()
-    matches = []
-    for task in tasks:
-        when = task.get("when", "")
+def build_index(tasks: list[dict], years: list[int], problems: list[str] | None = None) -> dict[str, list[int]]:
+    """Map ISO date to the indexes of the tasks due that day, for every day of `years`."""
+    start, end = date(min(years), 1, 1), date(max(years), 12, 31)
+    problems = [] if problems is None else problems
+    by_date: dict[str, list[int]] = {}
+    for i, task in enumerate(tasks):
+        if "when" not in task:
+            problems.append(f"line {task['line']}: {task['title']!r} has no When:")
+            continue
         try:
-            task_date = datetime.strptime(f"{when} {today.year}", "%B %d %Y")
-            if task_date.month == today.month and task_date.day == today.day:
-                matches.append(task)
-        except ValueError:
-            pass
+            rule = parse_rule(task["when"])
+            parse_at(task.get("at"))
+        except ValueError as e:
+            problems.append(f"line {task['line']}: {task['title']!r}: {e}")
+            continue
+        for day in rule.occurrences(start, end):
+            by_date.setdefault(day.isoformat(), []).append(i)
+    return by_date
+
+
+def parse_at(text: str | None) -> tuple[time, ZoneInfo]:
+    """Parse an At: field ("9:00", "2:30 pm", "14:00 America/Chicago") into a local time and zone."""
+    m = AT_RE.match((text or REMIND_AT).strip())
+    if not m:
+        raise ValueError(f"unrecognized At: {text!r}")
+    hour, minute, ampm, zone = m.groups()
+    hour, minute = int(hour), int(minute or 0)
+    if ampm:
+        if not 1 <= hour <= 12:
+            raise ValueError(f"bad hour in At: {text!r}")
+        hour = hour % 12 + (12 if ampm.lower() == "pm" else 0)
+    if hour > 23 or minute > 59:
+        raise ValueError(f"bad time in At: {text!r}")
+    try:
+        tz = ZoneInfo(zone or TIMEZONE)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"unknown timezone in At: {text!r}") from None
+    return time(hour, minute), tz
+
+
+def load_schedule(path: str = CADENCE_FILE, cache_path: str = INDEX_CACHE, years: list[int] | None = None) -> dict:
+    """Return {"sha256", "years", "tasks", "by_date", "problems"} for the cadence file.
+
+    Every task's When: rule is expanded into concrete dates for `years`
+    (default: this year and next).  The index is cached on disk keyed by the
+    file's content hash, so it is only rebuilt when cadence.md changes or a
+    year outside the cached range is asked for.
+    """
+    return load_schedules([path], cache_path, years)[0]
+
+
+def load_schedules(paths: list[str], cache_path: str = INDEX_CACHE, years: list[int] | None = None) -> list[dict]:
+    """load_schedule() for several cadence files at once, sharing one cache file.
+
+    The cache holds one index per file content, so identical files share an
+    entry; entries for content no longer asked for are dropped.
+    """
+    this_year = datetime.now().year
+    years = sorted(set(years or []) | {this_year, this_year + 1})
+
+    try:
+        with open(cache_path) as f:
+            cached = json.load(f)["schedules"]
+    except (OSError, ValueError, KeyError, TypeError):
+        cached = {}
+
+    schedules, keep, rebuilt = [], {}, False
+    for path in paths:
+        with open(path, "rb") as f:
+            content = f.read()
+        digest = hashlib.sha256(content).hexdigest()
+        schedule = keep.get(digest) or cached.get(digest)
+        if not schedule or not set(years) <= set(schedule["years"]):
+            problems: list[str] = []
+            tasks = parse_cadence_lines(content.decode().splitlines(), problems)
+            by_date = build_index(tasks, years, problems)
+            schedule = {"sha256": digest, "years": years, "tasks": tasks, "by_date": by_date, "problems": problems}
+            rebuilt = True
+        keep[digest] = schedule
+        schedules.append(schedule)
+
+    if rebuilt or keep.keys() != cached.keys():
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            tmp = f"{cache_path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump({"schedules": keep}, f)
+            os.replace(tmp, cache_path)
+        except OSError as e:
+            print(f"Could not write cadence index cache: {e}", file=sys.stderr)
+    return schedules
+
+
+def tasks_on(schedule: dict, day: date) -> list[dict]:
+    return [schedule["tasks"][i] for i in schedule["by_date"].get(day.isoformat(), [])]
+
+
+def tasks_for_today(schedule: dict) -> list[dict]:
+    return tasks_on(schedule, datetime.now().date())
+
+
+def tasks_between(schedule: dict, start: date, days: int) -> list[tuple[date, dict]]:
+    """(date, task) pairs for every task due in the `days` days starting at `start`."""
+    return [
+        (day, task)
+        for day in (start + timedelta(days=n) for n in range(days))
+        for task in tasks_on(schedule, day)
+    ]
 
-    return matches
 
+def load_people(path: str | None = PEOPLE_FILE) -> dict[str, str]:
+    """Return {name: email} from the people directory."""
+    if not path:
+        return {}
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
 
-def build_html(tasks: list[dict]) -> str:
+
+def assignees(task: dict) -> list[str]:
+    """Names in a task's Who: field ("Ian Rose", "Ian Rose and Linda Green", ...)."""
+    return [name.strip() for name in re.split(r",|&|\band\b", task.get("who", "")) if name.strip()]
+
+
+def route_tasks(tasks: list[dict], people: dict[str, str], default: str = DEFAULT_RECIPIENT) -> dict[str, list[dict]]:
+    """Group tasks by recipient address; unknown or missing assignees go to `default`."""
+    routed: dict[str, list[dict]] = {}
+    for task in tasks:
+        addresses = []
+        for name in assignees(task):
+            if name in people:
+                addresses.append(people[name])
+            else:
+                print(f"No address for {name!r} in the people directory; sending to {default}", file=sys.stderr)
+        for address in dict.fromkeys(addresses or [default]):
+            routed.setdefault(address, []).append(task)
+    return routed
+
+
+def make_mailer(smtp: str | None):
+    if smtp:
+        host, _, port = smtp.partition(":")
+        return SmtpMailer(host or "localhost", int(port or 1025))
+    return ResendMailer(os.environ["RESEND_API_KEY"])
+
+
+def queue_reminders(outbox: Outbox, tasks: list[dict], day: date, org: Org = DEFAULT_ORG) -> int:
+    """Queue one outbox row per (task, day, recipient); returns how many were new.
+
+    Each row's payload carries the org's name and sender, so a digest can be
+    composed (or retried on a later run) without the org settings.
+    """
+    people = load_people(org.people)
+    prefix = f"{org.name}|" if org.name else ""
+    return sum(
+        outbox.enqueue(prefix + task_id(task), day, address, {**task, "org": org.name, "sender": org.sender, "url": org.url})
+        for address, routed in route_tasks(tasks, people, org.recipient).items()
+        for task in routed
+    )
+
+
+def compose_digest(recipient: str, day: date, tasks: list[dict]) -> dict:
+    # the outbox never mixes orgs in one digest; rows queued before orgs existed have no "org"
+    first = tasks[0]
+    name = first.get("org") or "Scholarship Fund"
+    return {
+        "from": first.get("sender", SENDER),
+        "to": recipient,
+        "subject": f"{name} Reminder — {day.strftime('%B %-d')}",
+        "html": build_html(tasks, first.get("url", CADENCE_URL)),
+    }
+
+
+def flush_outbox(outbox: Outbox, mailer, workers: int = 4, rate: float = 2.0) -> dict[str, int]:
+    stats = outbox.flush(mailer, compose_digest, max_workers=workers, per_second=rate)
+    print("Outbox:", ", ".join(f"{name} {n}" for name, n in stats.items()))
+    return stats
+
+
+def build_html(tasks: list[dict], url: str | None = CADENCE_URL) -> str:
     items = ""
     for t in tasks:
         items += f"<li><strong>{t['title']}</strong><br>"
@@ -62,36 +355,224 @@ def build_html(tasks: list[dict]) -> str:
         if "who" in t:
             items += f"Who: {t['who']}"
         items += "</li>\n"
+    link = f'<p><a href="{url}">View full cadence</a></p>\n' if url else ""
     return f"""
 <h2>Scholarship Fund Reminders for Today</h2>
 <ul>
 {items}
 </ul>
-<p><a href="https://github.com/ianrose14/scholarshipfund/blob/main/cadence.md">View full cadence</a></p>
-"""
+{link}"""
+
+
+# --------------------
+# --serve: long-running scheduler
+# --------------------
+
+class FiredLog:
+    """Durable record of sent reminders, so a restart neither repeats nor skips one."""
+
+    def __init__(self, path: str = FIRED_DB):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.execute("CREATE TABLE IF NOT EXISTS fired (task TEXT, day TEXT, fired_at TEXT, PRIMARY KEY (task, day))")
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.db.commit()
+
+    def has_fired(self, task: str, day: date) -> bool:
+        row = self.db.execute("SELECT 1 FROM fired WHERE task = ? AND day = ?", (task, day.isoformat())).fetchone()
+        return row is not None
+
+    def record(self, task: str, day: date):
+        self.db.execute(
+            "INSERT OR IGNORE INTO fired VALUES (?, ?, ?)",
+            (task, day.isoformat(), datetime.now(timezone.utc).isoformat()),
+        )
+        self.db.commit()
+
+    def last_seen(self) -> datetime | None:
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'last_seen'").fetchone()
+        return datetime.fromisoformat(row[0]) if row else None
+
+    def touch(self, now: datetime):
+        self.db.execute("INSERT OR REPLACE INTO meta VALUES ('last_seen', ?)", (now.isoformat(),))
+        self.db.commit()
+
+
+def task_id(task: dict) -> str:
+    return f"{task['title']}|{task.get('when', '')}"
+
+
+def next_fire_time(rule, at: time, tz: ZoneInfo, after: datetime) -> datetime | None:
+    """The first time strictly after `after` that the rule fires at `at` local time."""
+    day = rule.next_occurrence(after.astimezone(tz).date())
+    while day is not None:
+        fire_at = datetime.combine(day, at, tzinfo=tz)
+        if fire_at > after:
+            return fire_at
+        day = rule.next_occurrence(day + timedelta(days=1))
+    return None
+
+
+def serve(path: str, mailer, fired: FiredLog, outbox: Outbox, poll: float = 30.0,
+          catch_up: timedelta = timedelta(days=7), workers: int = 4, rate: float = 2.0):
+    """Fire reminders from a timer heap, reloading cadence.md whenever it changes.
+
+    Reminders missed while the process was down (up to `catch_up` ago) fire
+    on start; ones already in the fired log are never queued twice.  Queued
+    mail that failed to send is retried from the outbox on every wake-up.
+    """
+    tasks: dict[str, dict] = {}
+    compiled: dict[str, tuple] = {}  # task id -> (When:, At:, rule, time, tz)
+    scheduled: dict[str, tuple[datetime, date]] = {}  # task id -> (fire at, occurrence day)
+    heap: list[tuple[datetime, str]] = []
+    mtime = None
+
+    def schedule(tid, fire_at, day):
+        scheduled[tid] = (fire_at, day)
+        heapq.heappush(heap, (fire_at, tid))
+
+    def schedule_next(tid, after):
+        _, _, rule, at, tz = compiled[tid]
+        fire_at = next_fire_time(rule, at, tz, after)
+        if fire_at:
+            schedule(tid, fire_at, fire_at.date())
+        else:
+            scheduled.pop(tid, None)
+
+    def reload(after):
+        nonlocal tasks
+        latest = {task_id(t): t for t in parse_cadence(path)}
+        changed = 0
+        for tid, task in latest.items():
+            source = (task.get("when"), task.get("at"))
+            if tid in compiled and compiled[tid][:2] == source:
+                continue
+            changed += 1
+            try:
+                rule = parse_rule(task.get("when", ""))
+                at, tz = parse_at(task.get("at"))
+            except ValueError as e:
+                print(f"cadence.md line {task['line']}: {e}", file=sys.stderr)
+                compiled.pop(tid, None)
+                scheduled.pop(tid, None)
+                continue
+            compiled[tid] = (*source, rule, at, tz)
+            schedule_next(tid, after)
+        for tid in tasks.keys() - latest.keys():
+            compiled.pop(tid, None)
+            scheduled.pop(tid, None)
+        tasks = latest
+        print(f"Loaded {len(tasks)} task(s), {changed} new or changed; {len(scheduled)} scheduled.")
+
+    start = datetime.now(timezone.utc)
+    resume_from = max(fired.last_seen() or start, start - catch_up)
+    while True:
+        now = datetime.now(timezone.utc)
+        current = os.stat(path).st_mtime_ns
+        if current != mtime:
+            reload(resume_from if mtime is None else now)
+            mtime = current
+
+        due: dict[date, list[str]] = {}
+        while heap and heap[0][0] <= now:
+            fire_at, tid = heapq.heappop(heap)
+            if tid not in scheduled or scheduled[tid][0] != fire_at:
+                continue  # superseded by a reload
+            day = scheduled[tid][1]
+            if fired.has_fired(tid, day):
+                schedule_next(tid, fire_at)
+                continue
+            due.setdefault(day, []).append(tid)
+
+        for day, tids in due.items():
+            print(f"Firing {len(tids)} reminder(s) for {day:%B %-d}.")
+            queue_reminders(outbox, [tasks[tid] for tid in tids], day)
+            for tid in tids:
+                fired.record(tid, day)
+                schedule_next(tid, scheduled[tid][0])
+        if outbox.pending():
+            flush_outbox(outbox, mailer, workers, rate)
+
+        fired.touch(now)
+        wait = poll
+        if heap:
+            wait = min(wait, (heap[0][0] - datetime.now(timezone.utc)).total_seconds())
+        _time.sleep(max(wait, 0.1))
 
 
 def main():
-    tasks = parse_cadence(CADENCE_FILE)
-    todays = tasks_for_today(tasks)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orgs", metavar="PATH", help="directory of cadence files or JSON manifest of orgs (default: cadence.md)")
+    parser.add_argument("--upcoming", type=int, metavar="DAYS", help="list items due in the next DAYS days instead of sending email")
+    parser.add_argument("--check", action="store_true", help="validate the cadence files (fields and When: rules) and exit")
+    parser.add_argument("--serve", action="store_true", help="keep running, firing each reminder at its own At: time")
+    parser.add_argument("--poll", type=float, default=30.0, help="--serve: seconds between checks for cadence.md changes (default: %(default)s)")
+    parser.add_argument("--smtp", metavar="HOST:PORT", help="send through this SMTP server (e.g. a local stand-in) instead of Resend")
+    parser.add_argument("--workers", type=int, default=4, help="concurrent sends (default: %(default)s)")
+    parser.add_argument("--rate", type=float, default=2.0, help="max sends per second (default: %(default)s)")
+    args = parser.parse_args()
 
-    if not todays:
-        print("No cadence items for today.")
+    if args.serve:
+        if args.orgs:
+            parser.error("--serve runs the single cadence.md; use the daily run for --orgs")
+        try:
+            serve(CADENCE_FILE, make_mailer(args.smtp), FiredLog(), Outbox(OUTBOX_DB),
+                  poll=args.poll, workers=args.workers, rate=args.rate)
+        except KeyboardInterrupt:
+            pass
         return
 
-    print(f"Found {len(todays)} item(s) for today — sending email.")
+    try:
+        orgs = load_orgs(args.orgs) if args.orgs else [DEFAULT_ORG]
+    except (OSError, ValueError) as e:
+        sys.exit(f"--orgs: {e}")
+    now = datetime.now(timezone.utc)
+    today = {org.name: org.today(now) for org in orgs}
+    years = {day.year for day in today.values()}
+    if args.upcoming:
+        years |= {(day + timedelta(days=args.upcoming)).year for day in today.values()}
+    schedules = dict(zip(today, load_schedules([org.cadence for org in orgs], years=sorted(years))))
+
+    if args.check:
+        problems = [f"{org.label} {problem}" for org in orgs for problem in schedules[org.name]["problems"]]
+        for problem in problems:
+            print(problem)
+        tasks = sum(len(schedules[org.name]["tasks"]) for org in orgs)
+        print(f"{tasks} task(s) in {len(orgs)} cadence file(s), {len(problems)} problem(s).")
+        sys.exit(1 if problems else 0)
 
-    html = build_html(todays)
-    subject = f"Scholarship Fund Reminder — {datetime.now().strftime('%B %-d')}"
+    for org in orgs:
+        for problem in schedules[org.name]["problems"]:
+            print(f"{org.label} {problem}", file=sys.stderr)
 
-    resend.Emails.send({
-        "from": "ianrose@allisonrosememorialfund.org",
-        "to": "ianrose14@gmail.com",
-        "subject": subject,
-        "html": html,
-    })
+    if args.upcoming is not None:
+        upcoming = sorted(
+            ((day, org.name, task) for org in orgs for day, task in tasks_between(schedules[org.name], today[org.name], args.upcoming)),
+            key=lambda item: (item[0], item[1]),
+        )
+        for day, name, task in upcoming:
+            print(f"{day:%a %b %d}  " + (f"[{name}] " if name else "") + task["title"]
+                  + (f" ({task['who']})" if "who" in task else ""))
+        return
 
-    print("Email sent.")
+    outbox = Outbox(OUTBOX_DB)
+    found = 0
+    for org in orgs:
+        todays = tasks_on(schedules[org.name], today[org.name])
+        if not todays:
+            continue
+        found += len(todays)
+        queued = queue_reminders(outbox, todays, today[org.name], org)
+        print((f"{org.name}: " if org.name else "") + f"Found {len(todays)} item(s) for today — {queued} new reminder(s) queued.")
+
+    if not found:
+        print("No cadence items for today.")
+    # one mail client, and one flush, for every org's reminders
+    if outbox.pending():
+        failed_before = outbox.stats()["failed"]
+        stats = flush_outbox(outbox, make_mailer(args.smtp), args.workers, args.rate)
+        if stats["queued"] or stats["failed"] > failed_before:
+            sys.exit(1)
 
 
 if __name__ == "__main__":
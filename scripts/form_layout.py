@@ -0,0 +1,586 @@
+#!/usr/bin/env python3
+"""Declarative form layout shared by the PDF generators.
+
+A form is described once as a spec: a dict of page settings plus a list of
+blocks (section headers, field rows, checkbox groups, text).  compile_layout()
+resolves the spec into absolute drawing operations and caches the result by
+the spec's hash, so re-renders and batch renders skip layout entirely;
+render_layout() just replays the operations onto fresh pages.
+
+Spec settings (all optional): font, fontsize, margin, row_gap, page_top
+(where the cursor starts on continuation pages, below the margin).
+
+Flow blocks are stacked top to bottom from a cursor and run onto as many
+pages as they need; content stops above the footer, which is repeated on
+every page.  Any flow block may set "y" to move the cursor to an absolute
+position first, "keep_together" to not be split across pages, or
+"keep_with_next" to move to a new page with the block that follows it
+(section headers do by default).  {"kind": "page_break"} forces a new page.
+
+    {"kind": "centered", "text", "fontname", "fontsize", "underline", "color"}
+    {"kind": "lines", "lines": [...], "spacing", "after", "indent", "fontname",
+                      "fontsize", "valign": "baseline" | "top"}
+    {"kind": "section", "title"}           ruled section header
+    {"kind": "rule", "width", "color", "after"}
+    {"kind": "space", "height"}
+    {"kind": "textbox", "text", "height", "advance"}
+    {"kind": "fields", "rows": [[field, ...], ...], "xalign"}
+        field: {"name", "label", "size" (-1 = rest of the line),
+                "type": "text" | "checkbox", "reverse" (label after widget)}
+    {"kind": "row", "items": [...], "advance"}
+        item: {"x" (offset from the margin), "label", "width", "gap",
+               "name" (defaults to the label), "signature", "fontname"}
+           or {"x", "checkbox": <name>, "label"}
+           or {"x", "text", "fontname"}
+    {"kind": "signature", "x", "items": [{"label", "width"}, ...]}
+
+Fixed blocks are placed at absolute positions on the current page and don't
+move the cursor:
+
+    {"kind": "image", "rect": [x0, y0, x1, y1], "file"}
+    {"kind": "letterhead", "lines": [{"text", "fontsize"}, ...]}
+    {"kind": "footer", "lines": [...], "fontsize"}   on every page
+
+Letterheads and footers are drawn once per process and placed on each page
+as the same Form XObject, so a 40-page batch report carries one copy of
+them rather than forty.
+"""
+
+import hashlib
+import json
+import os
+
+import pymupdf
+
+from pdf_assets import DEFAULT_DPI, fit_image
+from pdf_metrics import line_height, text_length, text_lengths
+from pdf_save import file_inputs
+
+# letterhead and footer shared by every fund form
+LETTERHEAD = {
+    "kind": "letterhead",
+    "lines": [
+        {"text": "Dr. Allison Rose"},
+        {"text": "Memorial Fund"},
+        {"text": "A 501(c)(3) nonprofit organization", "fontsize": 8},
+    ],
+}
+
+FOOTER = {
+    "kind": "footer",
+    "lines": [
+        "applications@allisonrosememorialfund.org",
+        "Dr. Allison Rose Memorial Fund - https://allisonrosememorialfund.org",
+    ],
+    "fontsize": 8,
+}
+
+page_width = 595  # pymupdf's default page size (A4)
+page_height = 842
+
+# images are embedded pre-scaled to this resolution; None embeds the originals
+image_dpi = DEFAULT_DPI
+
+# letterheads and footers are drawn once into a component page and stamped
+# onto every page as a shared Form XObject; False draws them inline
+stamp_components = True
+
+field_line_color = (0.75, 0.75, 0.75)
+section_color = (0.6, 0.6, 0.6)
+
+_layout_cache = {}
+_cache_stats = {"hits": 0, "misses": 0}
+
+_components = {}  # (ops, width, height) -> one-page document, per process
+
+
+class _Context:
+    def __init__(self, spec, width, height):
+        self.font = spec.get("font", "Helvetica")
+        self.fontsize = spec.get("fontsize", 10)
+        self.margin = spec.get("margin", 20)
+        self.row_gap = spec.get("row_gap", 6)
+        self.width = width
+        self.height = height
+        self.xmax = width - self.margin
+        self.ymax = height - self.margin
+
+
+def spec_hash(spec):
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()
+
+
+def compile_layout(spec, width=page_width, height=page_height):
+    """Return the spec's pages as tuples of absolute drawing operations (cached)."""
+    key = (spec_hash(spec), width, height)
+    layout = _layout_cache.get(key)
+    if layout is None:
+        _cache_stats["misses"] += 1
+        layout = _layout_cache[key] = _compile(spec, _Context(spec, width, height))
+    else:
+        _cache_stats["hits"] += 1
+    return layout
+
+
+def layout_cache_stats():
+    return dict(_cache_stats, size=len(_layout_cache))
+
+
+def layout_images(layout):
+    """The image files a compiled layout draws (e.g. to track them as build inputs)."""
+    def walk(ops):
+        for op in ops:
+            if op[0] == "stamp":
+                yield from walk(op[1])
+            elif op[0] == "image":
+                yield op[-1]
+
+    return sorted({filename for ops in layout for filename in walk(ops)})
+
+
+def spec_inputs(spec, width=page_width, height=page_height):
+    """What a rendered spec depends on, for save_pdf(inputs=...): the spec, the
+    layout code and settings, and the image files it draws."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    code = [os.path.join(here, f"{name}.py") for name in ("form_layout", "pdf_assets", "pdf_metrics")]
+    return {
+        "spec": spec_hash(spec),
+        "page": [width, height],
+        "settings": {"image_dpi": image_dpi, "stamp_components": stamp_components},
+        "files": file_inputs(code + layout_images(compile_layout(spec, width, height))),
+    }
+
+
+def render_layout(doc, layout, width=page_width, height=page_height, images=None):
+    """Append one page per compiled page to doc and draw its operations.
+
+    `images` maps image files and stamped components to their xref in doc;
+    pass the same dict to every call on one document so each is embedded
+    only once.
+    """
+    images = {} if images is None else images
+    for ops in layout:
+        render_page(doc.new_page(width=width, height=height), ops, images)
+
+
+def render_spec(doc, spec, width=page_width, height=page_height, images=None):
+    render_layout(doc, compile_layout(spec, width, height), width, height, images)
+
+
+def render_page(page, ops, images=None):
+    images = {} if images is None else images
+    stamps = []
+    for op in ops:
+        kind = op[0]
+        if kind == "text":
+            _, x, y, text, fontname, fontsize, color = op
+            page.insert_text((x, y), text, fontname=fontname, fontsize=fontsize, color=color)
+        elif kind == "line":
+            _, x0, y0, x1, y1, color, width = op
+            page.draw_line((x0, y0), (x1, y1), color=color, width=width)
+        elif kind == "textbox":
+            _, x0, y0, x1, y1, text, fontname, fontsize = op
+            page.insert_textbox((x0, y0, x1, y1), text, fontname=fontname, fontsize=fontsize)
+        elif kind == "widget":
+            _, x0, y0, x1, y1, name, checkbox, fontname, fontsize = op
+            page.add_widget(_make_widget(pymupdf.Rect(x0, y0, x1, y1), name, checkbox, fontname, fontsize))
+        elif kind == "image":
+            _, x0, y0, x1, y1, filename = op
+            rect = pymupdf.Rect(x0, y0, x1, y1)
+            if image_dpi:
+                filename = fit_image(filename, rect.width, rect.height, image_dpi)
+            if filename in images:
+                page.insert_image(rect, xref=images[filename])
+            else:
+                images[filename] = page.insert_image(rect, filename=filename)
+        elif kind == "stamp":
+            if stamp_components:
+                stamps.append(op[1])
+            else:
+                render_page(page, op[1], images)
+        else:
+            raise ValueError(f"unknown layout operation {kind!r}")
+    # Stamped last: pymupdf counts fonts inside a shown page as the page's
+    # own, so text drawn after a stamp could lose its font resource.
+    for component_ops in stamps:
+        _place_component(page, component_ops, images)
+
+
+def _place_component(page, ops, images):
+    """Show the component on page, reusing its XObject if the document already has it."""
+    key = ("stamp", ops, page.rect.width, page.rect.height)
+    if key not in images:
+        images[key] = page.show_pdf_page(page.rect, *_component(*key[1:]))
+        return
+    # what show_pdf_page() would add, minus a fresh wrapper XObject per page
+    doc, name = page.parent, f"fzStamp{images[key]}"
+    kind, value = doc.xref_get_key(page.xref, "Resources")
+    if kind == "xref":
+        doc.xref_set_key(int(value.split()[0]), f"XObject/{name}", f"{images[key]} 0 R")
+    else:
+        doc.xref_set_key(page.xref, f"Resources/XObject/{name}", f"{images[key]} 0 R")
+    xref = doc.get_new_xref()
+    doc.update_object(xref, "<<>>")
+    doc.update_stream(xref, f" q /{name} Do Q ".encode())
+    contents = " ".join(f"{x} 0 R" for x in [*page.get_contents(), xref])
+    doc.xref_set_key(page.xref, "Contents", f"[{contents}]")
+
+
+def _component(ops, width, height):
+    """(document, page number) of the component drawn from ops, rendering it on first use.
+
+    Each component gets its own one-page document: show_pdf_page() caches
+    what it has copied from a source document, so a source must not grow
+    after it has been shown.
+    """
+    key = (ops, width, height)
+    if key not in _components:
+        component = pymupdf.open()
+        render_page(component.new_page(width=width, height=height), ops, {})
+        _components[key] = component
+    return _components[key], 0
+
+
+def _make_widget(rect, name, checkbox, fontname, fontsize):
+    widget = pymupdf.Widget()
+    widget.rect = rect
+    widget.field_name = name
+    if checkbox:
+        widget.field_type = pymupdf.PDF_WIDGET_TYPE_CHECKBOX
+        widget.text_font = 'ZaDb'
+        widget.text_fontsize = 0
+        widget.border_color = (0, 0, 0)
+        widget.border_width = 1
+    else:
+        widget.field_type = pymupdf.PDF_WIDGET_TYPE_TEXT
+        widget.text_font = fontname
+        widget.text_fontsize = fontsize
+    return widget
+
+
+# --------------------
+# Layout pass
+# --------------------
+
+def _compile(spec, ctx):
+    """Stream the blocks onto pages in one pass, breaking pages as needed.
+
+    Every block is measured once into chunks -- the units a page may break
+    between: one per row of a fields block or line of a lines block, one for
+    anything else.  Footers are drawn on every page and content stops above
+    them.  A block marked keep_with_next (section headers by default) moves
+    to the next page rather than end a page without what follows it.
+    """
+    blocks = spec["blocks"]
+    footer_ops = [op for block in blocks if block["kind"] == "footer" for op in _footer(block, ctx)]
+    limit = _content_bottom(footer_ops, ctx)
+    footer = [_stamp(footer_ops)] if footer_ops else []
+    top = ctx.margin + spec.get("page_top", 20)
+
+    measured = []
+    for block in blocks:
+        kind = block["kind"]
+        if kind == "footer":
+            continue
+        if kind in _fixed_blocks:
+            ops = _fixed_blocks[kind](block, ctx)
+            # images already share one xref per document; text components are stamped
+            measured.append((block, ops if kind == "image" else [_stamp(ops)]))
+        elif kind == "page_break":
+            measured.append((block, None))
+        else:
+            measured.append((block, _chunked_blocks.get(kind, _single_chunk)(block, ctx)))
+
+    pages = []
+    ops = []
+    y = ctx.margin
+
+    def new_page():
+        nonlocal ops, y
+        pages.append(tuple(ops + footer))
+        ops = []
+        y = top
+
+    for i, (block, chunks) in enumerate(measured):
+        kind = block["kind"]
+        if kind in _fixed_blocks:
+            ops.extend(chunks)
+            continue
+        if kind == "page_break":
+            new_page()
+            continue
+        if "y" in block:
+            y = block["y"]
+
+        if y > top and y + _extent(_kept(measured, i)) > limit:
+            new_page()
+
+        for chunk_ops, advance in chunks:
+            if y > top and y + _extent([(chunk_ops, advance)]) > limit:
+                new_page()
+            ops.extend(_translate(op, y) for op in chunk_ops)
+            y += advance
+
+    pages.append(tuple(ops + footer))
+    return tuple(pages)
+
+
+def _stamp(ops):
+    """A static component: drawn once, then placed on each page that uses it."""
+    return ("stamp", tuple(ops))
+
+
+def _kept(measured, i):
+    """The chunks that must share a page with the start of block i.
+
+    That's its first chunk (all of them if keep_together), extended through
+    the following flow blocks for as long as keep_with_next asks.
+    """
+    kept = []
+    for block, chunks in measured[i:]:
+        if block["kind"] in _fixed_blocks:
+            continue
+        if block["kind"] == "page_break":
+            break
+        kept.extend(chunks if block.get("keep_together") else chunks[:1])
+        if not block.get("keep_with_next", block["kind"] == "section"):
+            break
+        if not block.get("keep_together"):
+            kept.extend(chunks[1:])  # the whole block stays with what follows
+    return kept
+
+
+def _content_bottom(footer, ctx):
+    """Lowest y content may reach: the top of the footer's first line, or the bottom margin."""
+    texts = [op for op in footer if op[0] == "text"]
+    if not texts:
+        return ctx.ymax
+    first = min(texts, key=lambda op: op[2])
+    return first[2] - line_height(first[4], first[5])
+
+
+def _extent(chunks):
+    """How far below the cursor a run of chunks reaches: their advance, or lower if an op hangs below it."""
+    y = bottom = 0
+    for chunk_ops, advance in chunks:
+        for op in chunk_ops:
+            bottom = max(bottom, y + max(op[i] for i in _y_fields[op[0]]))
+        y += advance
+        bottom = max(bottom, y)
+    return bottom
+
+
+def _single_chunk(block, ctx):
+    return [_flow_blocks[block["kind"]](block, ctx)]
+
+
+_y_fields = {"text": (2,), "line": (2, 4), "textbox": (2, 4), "widget": (2, 4), "image": (2, 4)}
+
+
+def _translate(op, dy):
+    op = list(op)
+    for i in _y_fields[op[0]]:
+        op[i] += dy
+    return tuple(op)
+
+
+def _color(value):
+    return tuple(value) if value is not None else None
+
+
+def _text(x, y, text, fontname, fontsize, color=None):
+    return ("text", x, y, text, fontname, fontsize, color)
+
+
+def _line(x0, y0, x1, y1, color=(0, 0, 0), width=1):
+    return ("line", x0, y0, x1, y1, color, width)
+
+
+def _centered_ops(text, ctx, fontname, fontsize, underline=False, color=None):
+    # centered between x=0 and the right margin, as the original generators did
+    length = text_length(text, fontname, fontsize)
+    x = (ctx.xmax - length) / 2
+    h = line_height(fontname, fontsize)
+    ops = [_text(x, h, text, fontname, fontsize, color)]
+    if underline:
+        ops.append(_line(x, h + 8, x + length, h + 8, color=color or (0, 0, 0)))
+        return ops, h + 1
+    return ops, h
+
+
+# --------------------
+# Flow blocks: return (operations relative to the cursor, cursor advance),
+# or a list of those for blocks a page may break inside
+# --------------------
+
+def _centered(block, ctx):
+    return _centered_ops(
+        block["text"], ctx,
+        block.get("fontname", ctx.font), block.get("fontsize", ctx.fontsize),
+        block.get("underline", False), _color(block.get("color")),
+    )
+
+
+def _section(block, ctx):
+    return [
+        _line(ctx.margin, 0, ctx.xmax, 0, color=section_color),
+        _text(ctx.margin, 15, "  " + block["title"], ctx.font, ctx.fontsize + 2),
+        _line(ctx.margin, 22, ctx.xmax, 22, color=section_color),
+    ], 45
+
+
+def _rule(block, ctx):
+    return [_line(ctx.margin, 0, ctx.xmax, 0, color=_color(block.get("color", (0, 0, 0))), width=block.get("width", 1))], block.get("after", 0)
+
+
+def _space(block, ctx):
+    return [], block["height"]
+
+
+def _textbox(block, ctx):
+    height = block["height"]
+    op = ("textbox", ctx.margin, 0, ctx.xmax, height, block["text"], ctx.font, ctx.fontsize)
+    return [op], block.get("advance", height)
+
+
+def _fields(block, ctx):
+    """Rows of labelled widgets flowing left to right, 20pt apart; one chunk per row."""
+    rows = block["rows"]
+    font, fontsize = ctx.font, ctx.fontsize
+    largest_first_key = max(text_lengths([row[0].get("label", "") for row in rows if row], font, fontsize))
+
+    chunks = []
+    for row in rows:
+        ops = []
+        xpos = ctx.margin
+        for i, field in enumerate(row):
+            label = field.get("label", "")
+            name = field.get("name")
+            reverse = field.get("reverse", False)
+            label_len = text_length(label, font, fontsize)
+            if i == 0 and block.get("xalign") and label_len < largest_first_key:
+                label_len = largest_first_key
+            if label and name and not reverse and label[-1] not in ",:;?!.":
+                label += ":"
+                label_len += 1
+            if label and not reverse:
+                ops.append(_text(xpos, 0, label, font, fontsize))
+                xpos += label_len + 6
+            if name:
+                size = field.get("size", -1)
+                if size == -1:
+                    size = ctx.width - xpos - ctx.margin
+                checkbox = field.get("type") == "checkbox"
+                ops.append(("widget", xpos, -12, xpos + size, 5, name, checkbox, font, fontsize))
+                if not checkbox:
+                    ops.append(_line(xpos, 4, xpos + size, 4, color=field_line_color))
+                xpos += size + 4
+            if label and reverse:
+                ops.append(_text(xpos, 0, label, font, fontsize))
+                xpos += label_len + 6
+
+            xpos += 20  # 20 horizontal padding in between fields
+        chunks.append((ops, 20))
+    return chunks
+
+
+def _lines(block, ctx):
+    """One chunk per line; the last one carries the space after the block."""
+    fontname = block.get("fontname", ctx.font)
+    fontsize = block.get("fontsize", ctx.fontsize)
+    spacing = block.get("spacing", 15)
+    x = ctx.margin + block.get("indent", 0)
+    top = line_height(ctx.font, ctx.fontsize) if block.get("valign") == "top" else 0
+    chunks = [([_text(x, top, line, fontname, fontsize)], spacing) for line in block["lines"]]
+    if chunks:
+        chunks[-1] = (chunks[-1][0], spacing + block.get("after", 0))
+    return chunks
+
+
+def _row(block, ctx):
+    """Items placed at explicit x offsets on one baseline."""
+    ops = []
+    advances = []
+    for item in block["items"]:
+        x = ctx.margin + item.get("x", 0)
+        fontname = item.get("fontname", ctx.font)
+        if "checkbox" in item:
+            h = line_height(ctx.font, ctx.fontsize)
+            ops.append(_text(x + h + 5, 0, item["label"], ctx.font, ctx.fontsize))
+            ops.append(("widget", x, -h + 3, x + h, 3, item["checkbox"], True, ctx.font, ctx.fontsize))
+            advances.append(h + ctx.row_gap)
+        elif "text" in item:
+            ops.append(_text(x, 0, item["text"], fontname, ctx.fontsize))
+        else:
+            label = item["label"]
+            width = item.get("width", 200)
+            x1 = x + text_length(label, fontname, ctx.fontsize) + item.get("gap", 6)
+            ops.append(_text(x, 0, label, fontname, ctx.fontsize))
+            if not item.get("signature"):
+                ops.append(("widget", x1, -12, x1 + width, 5, item.get("name", label), False, fontname, ctx.fontsize))
+            ops.append(_line(x1, 4, x1 + width, 4, color=field_line_color))
+            advances.append(line_height(fontname, ctx.fontsize) + ctx.row_gap)
+    return ops, block.get("advance", max(advances, default=0))
+
+
+def _signature(block, ctx):
+    """Labels followed by blank lines to sign on, e.g. signature and date."""
+    ops = []
+    xpos = ctx.margin + block.get("x", 0)
+    for item in block["items"]:
+        ops.append(_text(xpos, 0, item["label"], ctx.font, ctx.fontsize))
+        xpos += text_length(item["label"], ctx.font, ctx.fontsize) + 5
+        ops.append(_line(xpos, 1, xpos + item["width"], 1))
+        xpos += item["width"] + 10
+    return ops, block.get("advance", 20)
+
+
+# --------------------
+# Fixed blocks: return absolute operations
+# --------------------
+
+def _image(block, ctx):
+    return [("image", *block["rect"], block["file"])]
+
+
+def _letterhead(block, ctx):
+    h = line_height(ctx.font, ctx.fontsize)
+    ops = []
+    for i, line in enumerate(block["lines"], 1):
+        fontsize = line.get("fontsize", ctx.fontsize)
+        ops.append(_text(ctx.xmax - text_length(line["text"], ctx.font, fontsize), i * h + ctx.margin, line["text"], ctx.font, fontsize))
+    return ops
+
+
+def _footer(block, ctx):
+    fontsize = block.get("fontsize", ctx.fontsize)
+    h = line_height(ctx.font, fontsize)
+    lines = block["lines"]
+    ops = []
+    for i, line in enumerate(lines):
+        line_ops, _ = _centered_ops(line, ctx, ctx.font, fontsize)
+        ops.extend(_translate(op, ctx.ymax - (len(lines) - i) * h) for op in line_ops)
+    return ops
+
+
+_flow_blocks = {
+    "centered": _centered,
+    "section": _section,
+    "rule": _rule,
+    "space": _space,
+    "textbox": _textbox,
+    "row": _row,
+    "signature": _signature,
+}
+
+# blocks a page can break inside: return [(operations, advance), ...]
+_chunked_blocks = {
+    "lines": _lines,
+    "fields": _fields,
+}
+
+_fixed_blocks = {
+    "image": _image,
+    "letterhead": _letterhead,
+    "footer": _footer,
+}
@@ -1,7 +1,19 @@
 #!/usr/bin/env python3
 
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
 import pymupdf
 
+from form_layout import FOOTER, LETTERHEAD, render_spec, spec_inputs
+from pdf_metrics import stats_summary
+from pdf_save import DEFAULT_PROFILE, SaveReport, add_profile_argument, is_current, save_pdf
+
 # references
 # * https://pymupdf.readthedocs.io/en/latest/widget.html
 
@@ -9,237 +21,206 @@ def_fontsize = 10
 margin = 20
 def_font = 'Helvetica'
 
-def create_application_form(output_path="forms/application_form_v1.pdf"):
+# cell values that tick a checkbox when pre-filling from a roster
+checked_values = {"1", "true", "yes", "y", "x", "on", "checked"}
+
+application_form = {
+    "font": def_font,
+    "fontsize": def_fontsize,
+    "margin": margin,
+    "blocks": [
+        {"kind": "image", "rect": [margin, margin, 60, 60], "file": "img/rose2.png"},
+        LETTERHEAD,
+        {"kind": "centered", "text": "Application Form", "fontname": "Helvetica-Bold", "fontsize": def_fontsize + 8, "underline": True, "y": margin},
+        {"kind": "lines", "y": 90, "spacing": 15, "after": 10, "lines": [
+            "  1. Please complete all sections of this form.  Typed responses are preferred.",
+            "  2. Sign and date the form at the bottom.",
+            "  3. Visit https://www.allisonrosememorialfund.org/apply.html to submit and view next steps.",
+            "  4. Questions?  Please e-mail applications@allisonrosememorialfund.org",
+        ]},
+
+        {"kind": "section", "title": "I. Personal Information"},
+        {"kind": "fields", "xalign": True, "rows": [
+            [
+                {"name": "fullname_field", "label": "Name (last, first)", "size": -1},
+            ],
+            [
+                {"name": "addr_field", "label": "Address", "size": -1},
+            ],
+            [
+                {"name": "addr2_field", "label": "Address (line 2)", "size": -1},
+            ],
+            [
+                {"name": "city_field", "label": "City", "size": 180},
+                {"name": "state_field", "label": "State", "size": 85},
+                {"name": "zip_field", "label": "Zip Code", "size": -1},
+            ],
+            [
+                {"name": "phone_field", "label": "Phone", "size": 180},
+                {"name": "email_field", "label": "Email", "size": -1},
+            ],
+        ]},
+
+        {"kind": "section", "title": "II. Academic Information"},
+        {"kind": "fields", "rows": [
+            [{"label": "NNP degree-granting program(s) you currently attend or are applying to for admission:"}],
+            [{"name": "program_field", "size": -1}],
+            [{"label": "Please check exactly one (1) of the following:"}],
+            [{"name": "current_fulltime_check", "label": "I am already enrolled in the FULL-time NNP program listed above.", "size": 20, "type": "checkbox", "reverse": True}],
+            [{"name": "current_parttime_check", "label": "I am already enrolled in the PART-time NNP program listed above.", "size": 20, "type": "checkbox", "reverse": True}],
+            [{"name": "applying_fulltime_check", "label": "I am currently applying to the FULL-time NNP program(s) listed above.", "size": 20, "type": "checkbox", "reverse": True}],
+            [{"name": "applying_parttime_check", "label": "I am currently applying to the PART-time NNP program(s) listed above.", "size": 20, "type": "checkbox", "reverse": True}],
+            [{"name": "applying_other_check", "label": "Other (please explain below):", "size": 20, "type": "checkbox", "reverse": True}],
+            [{"name": "applying_other_field1", "size": -1}],
+            [{"name": "applying_other_field2", "size": -1}],
+            [],
+            [
+                {"name": "start_date_field", "label": "Intended start date", "size": 100},
+                {"label": "          Planned enrollment status:"},
+                {"name": "fulltime_field", "label": "Full-time", "size": 20, "type": "checkbox", "reverse": True},
+                {"name": "parttime_field", "label": "Part-time", "size": 20, "type": "checkbox", "reverse": True},
+            ],
+            [
+                {"label": "If part-time, please list your anticipated course of study, including credit-hours per semester."},
+            ],
+            [
+                {"name": "parttime_details_year1_field", "size": -1},
+            ],
+            [
+                {"name": "parttime_details_year2_field", "size": -1},
+            ],
+            [
+                {"name": "parttime_details_year3_field", "size": -1},
+            ],
+        ]},
+
+        {"kind": "space", "height": 20},
+        # the certification block is never split across pages
+        {"kind": "rule", "color": [.6, .6, .6], "after": 18, "keep_with_next": True},
+        {"kind": "lines", "spacing": 20, "fontsize": def_fontsize + 2, "lines": ["Applicant Certification"], "keep_with_next": True},
+        {"kind": "lines", "indent": 10, "spacing": 13, "after": 22, "keep_with_next": True, "lines": [
+            "I certify that the information provided in this application is accurate and complete to the best of my knowledge,",
+            "and I understand that providing false information may affect my eligibility for this scholarship.",
+        ]},
+        {"kind": "signature", "x": 10, "items": [
+            {"label": "Applicant Signature:", "width": 250},
+            {"label": "Date:", "width": 90},
+        ]},
+
+        FOOTER,
+    ],
+}
+
+def create_application_form(output_path="forms/application_form_v1.pdf", profile=DEFAULT_PROFILE):
+    doc = build_application_form()
+    report = save_pdf(doc, output_path, profile, inputs=spec_inputs(application_form))
+    doc.close()
+    print("Wrote", output_path, f"[{report}]")
+    print("Text metrics:", stats_summary())
+
+def build_application_form():
     doc = pymupdf.open()  # Create a new PDF document
-    page = doc.new_page() # Add a new page
-
-    r = page.bound()
-    xmax = r[2] - margin
-    ymax = r[3] - margin
-    img_rect = pymupdf.Rect(margin, margin, 60, 60)
-    page.insert_image(img_rect, filename="img/rose2.png")
-
-    def insert_fund_name():
-        fontsize = def_fontsize
-        h = line_height(pymupdf.Font(def_font), fontsize)
-
-        text = 'Dr. Allison Rose'
-        text_length = pymupdf.get_text_length(text, fontname=def_font, fontsize=fontsize)
-        page.insert_text((xmax - text_length, h + margin), text, fontname=def_font, fontsize=fontsize)
-
-        text = 'Memorial Fund'
-        text_length = pymupdf.get_text_length(text, fontname=def_font, fontsize=fontsize)
-        page.insert_text((xmax - text_length, 2*h + margin), text, fontname=def_font, fontsize=fontsize)
-
-        text = 'A 501(c)(3) nonprofit organization'
-        text_length = pymupdf.get_text_length(text, fontname=def_font, fontsize=fontsize-2)
-        page.insert_text((xmax - text_length, 3*h + margin), text, fontname=def_font, fontsize=fontsize-2)
-
-    insert_fund_name()
-
-    def insert_centered_text(y, text, fontname=def_font, fontsize=def_fontsize, underline=False):
-        text_length = pymupdf.get_text_length(text, fontname=fontname, fontsize=fontsize)
-        x = (xmax - text_length) / 2
-        h = line_height(pymupdf.Font(fontname), fontsize)
-        page.insert_text((x, y+h), text, fontname=fontname, fontsize=fontsize)
-        if underline:
-            page.draw_line((x, y+h+8), (x + text_length, y+h+8), color=(0, 0, 0), width=1)
-            return y + h + 1
-        return y + h
-
-    title = 'Application Form'
-    insert_centered_text(margin, title, fontname='Helvetica-Bold', fontsize=def_fontsize+8, underline=True)
-
-    ypos = 90
-
-    lines = [
-        "  1. Please complete all sections of this form.  Typed responses are preferred.",
-        "  2. Sign and date the form at the bottom.",
-        "  3. Visit https://www.allisonrosememorialfund.org/apply.html to submit and view next steps.",
-        "  4. Questions?  Please e-mail applications@allisonrosememorialfund.org"
-    ]
-
-    for i, line in enumerate(lines):
-        page.insert_text((margin, ypos + 15 * i), line, fontname=def_font, fontsize=def_fontsize)
-
-    ypos = ypos + 10 + 15 * len(lines)
-
-    page.draw_line((margin, ypos), (xmax, ypos), color=(.6, .6, .6), width=1)
-    txt = "  I. Personal Information"
-    page.insert_text((margin, ypos+15), txt, fontname=def_font, fontsize=def_fontsize + 2)
-    page.draw_line((margin, ypos+22), (xmax, ypos+22), color=(.6, .6, .6), width=1)
-    ypos += 45
-
-    rows = [
-        [
-            {"name": "fullname_field", "label": "Name (last, first)", "size": -1},
-        ],
-        [
-            {"name": "addr_field", "label": "Address", "size": -1},
-        ],
-        [
-            {"name": "addr2_field", "label": "Address (line 2)", "size": -1},
-        ],
-        [
-            {"name": "city_field", "label": "City", "size": 180},
-            {"name": "state_field", "label": "State", "size": 85},
-            {"name": "zip_field", "label": "Zip Code", "size": -1},
-        ],
-        [
-            {"name": "phone_field", "label": "Phone", "size": 180},
-            {"name": "email_field", "label": "Email", "size": -1},
-        ]
-    ]
-
-    ypos = insert_form_fields(rows, page, ypos, xalign=True)
-
-    page.draw_line((margin, ypos), (xmax, ypos), color=(.6, .6, .6), width=1)
-    txt = "  II. Academic Information"
-    page.insert_text((margin, ypos+15), txt, fontname=def_font, fontsize=def_fontsize + 2)
-    page.draw_line((margin, ypos+22), (xmax, ypos+22), color=(.6, .6, .6), width=1)
-    ypos += 45
-
-    rows = [
-        [{"label": "NNP degree-granting program(s) you currently attend or are applying to for admission:"}],
-        [{"name": "program_field", "size": -1}],
-        [{"label": "Please check exactly one (1) of the following:"}],
-        [{"name": "current_fulltime_check", "label": "I am already enrolled in the FULL-time NNP program listed above.", "size": 20, "type": pymupdf.PDF_WIDGET_TYPE_CHECKBOX, "reverse": True}],
-        [{"name": "current_parttime_check", "label": "I am already enrolled in the PART-time NNP program listed above.", "size": 20, "type": pymupdf.PDF_WIDGET_TYPE_CHECKBOX, "reverse": True}],
-        [{"name": "applying_fulltime_check", "label": "I am currently applying to the FULL-time NNP program(s) listed above.", "size": 20, "type": pymupdf.PDF_WIDGET_TYPE_CHECKBOX, "reverse": True}],
-        [{"name": "applying_parttime_check", "label": "I am currently applying to the PART-time NNP program(s) listed above.", "size": 20, "type": pymupdf.PDF_WIDGET_TYPE_CHECKBOX, "reverse": True}],
-        [{"name": "applying_other_check", "label": "Other (please explain below):", "size": 20, "type": pymupdf.PDF_WIDGET_TYPE_CHECKBOX, "reverse": True}],
-        [{"name": "applying_other_field1", "size": -1}],
-        [{"name": "applying_other_field2", "size": -1}],
-        [],
-        [
-            {"name": "start_date_field", "label": "Intended start date", "size": 100},
-            {"label": "          Planned enrollment status:"},
-            {"name": "fulltime_field", "label": "Full-time", "size": 20, "type": pymupdf.PDF_WIDGET_TYPE_CHECKBOX, "reverse": True},
-            {"name": "parttime_field", "label": "Part-time", "size": 20, "type": pymupdf.PDF_WIDGET_TYPE_CHECKBOX, "reverse": True},
-        ],
-        [
-            {"label": "If part-time, please list your anticipated course of study, including credit-hours per semester."},
-        ],
-        [
-            {"name": "parttime_details_year1_field", "size": -1},
-        ],
-        [
-            {"name": "parttime_details_year2_field", "size": -1},
-        ],
-        [
-            {"name": "parttime_details_year3_field", "size": -1},
-        ]
-    ]
-    ypos = insert_form_fields(rows, page, ypos)
-
-    ypos += 20
-
-    page.draw_line((margin, ypos), (xmax, ypos), color=(.6, .6, .6), width=1)
-    ypos += 18
-
-    text = 'Applicant Certification'
-    page.insert_text((margin, ypos), text, fontname=def_font, fontsize=def_fontsize+2)
-    ypos += 20
-
-    text = 'I certify that the information provided in this application is accurate and complete to the best of my knowledge,'
-    page.insert_text((margin + 10, ypos), text, fontname=def_font, fontsize=def_fontsize)
-    ypos += 13
-    text = 'and I understand that providing false information may affect my eligibility for this scholarship.'
-    page.insert_text((margin + 10, ypos), text, fontname=def_font, fontsize=def_fontsize)
-    ypos += 35
-
-    text = 'Applicant Signature:'
-    xpos = margin + 10
-    page.insert_text((xpos, ypos), text, fontname=def_font, fontsize=def_fontsize)
-    text_length = pymupdf.get_text_length(text, fontname=def_font, fontsize=def_fontsize)
-    xpos += text_length + 5
-    page.draw_line((xpos, ypos+1), (xpos + 250, ypos+1), color=(0, 0, 0), width=1)
-    xpos += 250 + 10
-    text = 'Date:'
-    page.insert_text((xpos, ypos), text, fontname=def_font, fontsize=def_fontsize)
-    text_length = pymupdf.get_text_length(text, fontname=def_font, fontsize=def_fontsize)
-    xpos += text_length + 5
-    page.draw_line((xpos, ypos+1), (xpos + 90, ypos+1), color=(0, 0, 0), width=1)
-
-    text = 'applications@allisonrosememorialfund.org'
-    h = line_height(pymupdf.Font(def_font), def_fontsize - 2)
-    insert_centered_text(ymax - 2*h, text, fontsize=def_fontsize - 2)
-
-    text = 'Dr. Allison Rose Memorial Fund - https://allisonrosememorialfund.org'
-    h = line_height(pymupdf.Font(def_font), def_fontsize - 2)
-    insert_centered_text(ymax - h, text, fontsize=def_fontsize - 2)
-
-    doc.save(output_path)
+    render_spec(doc, application_form)
+    return doc
+
+def read_roster(path):
+    """Yield one dict of field values per scholar from a CSV or JSON roster.
+
+    Keys are widget names (fullname_field, addr_field, fulltime_field, ...).
+    """
+    if path.lower().endswith(".json"):
+        with open(path) as f:
+            yield from json.load(f)
+    else:
+        with open(path, newline="") as f:
+            yield from csv.DictReader(f)
+
+def roster_output_name(record, index):
+    slug = re.sub(r"[^a-z0-9]+", "_", str(record.get("fullname_field", "")).lower()).strip("_")
+    return f"application_{index:04d}_{slug}.pdf" if slug else f"application_{index:04d}.pdf"
+
+def fill_application_form(template, record, output_path, profile=DEFAULT_PROFILE, template_sha=None):
+    """Write a copy of the blank form (PDF bytes) with the record's values filled in.
+
+    Skipped when output_path's manifest shows it was already written from
+    the same template and record.
+    """
+    inputs = {"template": template_sha or hashlib.sha256(template).hexdigest(), "record": record}
+    if is_current(output_path, inputs, profile):
+        return SaveReport(output_path, profile, None, os.path.getsize(output_path), 0.0, written=False)
+    doc = pymupdf.open("pdf", template)
+    for page in doc:
+        for widget in page.widgets():
+            value = record.get(widget.field_name)
+            if value is None or str(value).strip() == "":
+                continue
+            if widget.field_type == pymupdf.PDF_WIDGET_TYPE_CHECKBOX:
+                checked = str(value).strip().lower() in checked_values
+                widget.field_value = widget.on_state() if checked else "Off"
+            else:
+                widget.field_value = str(value)
+            widget.update()
+    report = save_pdf(doc, output_path, profile, measure=False, inputs=inputs)
+    doc.close()
+    return report
+
+_template = None
+_template_sha = None
+_profile = DEFAULT_PROFILE
+
+def _init_batch_worker(template, profile):
+    global _template, _template_sha, _profile
+    _template = template
+    _template_sha = hashlib.sha256(template).hexdigest()
+    _profile = profile
+
+def _fill_batch_job(job):
+    record, output_path = job
+    return fill_application_form(_template, record, output_path, _profile, _template_sha)
+
+def create_application_batch(roster_path, output_dir="forms/renewals", workers=None, profile=DEFAULT_PROFILE):
+    """Write one pre-filled application per roster row, spread over a process pool.
+
+    The blank form is laid out once and shipped to each worker as PDF bytes;
+    workers only fill widgets and write their file, so nothing accumulates
+    in the parent no matter how long the roster is.
+    """
+    doc = build_application_form()
+    template = doc.tobytes(no_new_id=True)  # no random ID, so unchanged forms stay up to date
     doc.close()
-    print("Wrote", output_path)
-
-def insert_form_fields(rows, page, ypos, xalign=False):
-    r = page.bound()
-    xmax = r[2]
-    def full_width(x0):
-        return xmax - x0 - margin
-
-    def txtlen(s):
-        return pymupdf.get_text_length(s, fontname=def_font, fontsize=def_fontsize)
-
-    largest_first_key = max([txtlen(row[0].get("label", "")) for row in rows if len(row) > 0])
-
-    for row in rows:
-        xpos = margin
-        for i, field in enumerate(row):
-            label = field.get("label", "")
-            reverse = field.get("reverse", False)
-            label_len = txtlen(label)
-            if i == 0 and xalign and txtlen(label) < largest_first_key:
-                label_len = largest_first_key
-            if label and field.get("name") and not reverse and not (label[-1] in [",", ":", ";", "?", "!", "."]):
-                label += ":"
-                label_len += 1
-            if label and not reverse:
-                page.insert_text((xpos, ypos), label, fontname=def_font, fontsize=def_fontsize)
-                xpos += label_len + 6
-            if field.get("name"):
-                widget = pymupdf.Widget()
-                if field.get("size", -1) == -1:
-                    field["size"] = full_width(xpos)
-
-                widget.rect = pymupdf.Rect(xpos, ypos - 12, xpos + field["size"], ypos + 5)
-                widget.field_name = field["name"]
-                widget.field_type = field.get("type", pymupdf.PDF_WIDGET_TYPE_TEXT)
-                if widget.field_type == pymupdf.PDF_WIDGET_TYPE_CHECKBOX:
-                    widget.text_font = 'ZaDb'
-                    widget.text_fontsize = 0
-                    widget.border_color = (0, 0, 0)
-                    widget.border_width = 1
-                else:
-                    widget.text_font = def_font
-                    widget.text_fontsize = def_fontsize
-                page.add_widget(widget)
-
-                if widget.field_type != pymupdf.PDF_WIDGET_TYPE_CHECKBOX:
-                    page.draw_line(
-                        (xpos, ypos + 4),
-                        (xpos + field["size"], ypos + 4),
-                        color=(0.75, 0.75, 0.75),
-                        width=1
-                    )
-
-                xpos += field["size"] + 4
-            if label and reverse:
-                page.insert_text((xpos, ypos), label, fontname=def_font, fontsize=def_fontsize)
-                xpos += label_len + 6
-
-            xpos += 20  # 20 horizontal padding in between fields
-        ypos += 20
-
-    return ypos
-
-def line_height(font, fontsize):
-    h = font.ascender - font.descender # Relative to fontsize 1
-    return h * fontsize
+
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = (
+        (record, os.path.join(output_dir, roster_output_name(record, i)))
+        for i, record in enumerate(read_roster(roster_path), 1)
+    )
+
+    count = unchanged = total_bytes = total_seconds = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker, initargs=(template, profile)) as pool:
+        for report in pool.map(_fill_batch_job, jobs, chunksize=8):
+            count += 1
+            total_bytes += report.bytes
+            total_seconds += report.seconds
+            if report.written:
+                print("Wrote", report.path)
+            else:
+                unchanged += 1
+    print(f"Wrote {count - unchanged} application(s) to {output_dir}, {unchanged} unchanged "
+          f"[{profile}: {total_bytes:,} bytes, {total_seconds:.2f} s spent saving]")
+    return count
 
 def main():
-    create_application_form()
+    parser = argparse.ArgumentParser(description="Generate the scholarship application form.")
+    parser.add_argument("--roster", help="CSV or JSON roster of returning scholars; writes one pre-filled form per row")
+    parser.add_argument("--output-dir", default="forms/renewals", help="where batch forms are written (default: %(default)s)")
+    parser.add_argument("--workers", type=int, help="number of worker processes (default: one per CPU)")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    if args.roster:
+        create_application_batch(args.roster, args.output_dir, args.workers, args.profile)
+    else:
+        create_application_form(profile=args.profile)
 
 if __name__ == "__main__":
     main()
@@ -1,7 +1,13 @@
 #!/usr/bin/env python3
 
+import argparse
+
 import pymupdf
 
+from form_layout import FOOTER, LETTERHEAD, render_spec, spec_inputs
+from pdf_metrics import stats_summary
+from pdf_save import DEFAULT_PROFILE, add_profile_argument, save_pdf
+
 # --------------------
 # Global layout config
 # --------------------
@@ -12,245 +18,130 @@ margin = 20
 line_gap = 6
 
 # --------------------
-# Utility helpers
+# Form spec
 # --------------------
-
-def insert_centered_text(text, page, y, xmax, fontname=def_font, fontsize=def_fontsize, underline=False, color=(0, 0, 0)):
-    text_length = pymupdf.get_text_length(text, fontname=fontname, fontsize=fontsize)
-    x = (xmax - text_length) / 2
-    h = line_height(pymupdf.Font(fontname), fontsize)
-    page.insert_text((x, y+h), text, fontname=fontname, fontsize=fontsize, color=color)
-    if underline:
-        page.draw_line((x, y+h+8), (x + text_length, y+h+8), color=color, width=1)
-        return y + h + 1
-    return y + h
-
-def line_height(font, fontsize):
-    h = font.ascender - font.descender # Relative to fontsize 1
-    return h * fontsize
-
-def draw_label_and_form_field(page, xpos, ypos, label, field_width=200, signature=False, gap=6, fontname=def_font, fontsize=def_fontsize):
-    h = line_height(pymupdf.Font(fontname), fontsize)
-    label_len = pymupdf.get_text_length(label, fontname=fontname, fontsize=fontsize)
-    page.insert_text((xpos, ypos), label, fontname=fontname, fontsize=fontsize)
-
-    if not signature:
-        widget = pymupdf.Widget()
-        widget.rect = pymupdf.Rect(xpos + label_len + gap, ypos - 12, xpos + label_len + gap + field_width, ypos + 5)
-        widget.field_name = label
-        widget.field_type = pymupdf.PDF_WIDGET_TYPE_TEXT
-        widget.text_font = fontname
-        widget.text_fontsize = fontsize
-        page.add_widget(widget)
-
-    page.draw_line(
-        (xpos + label_len + gap, ypos + 4),
-        (xpos + label_len + gap + field_width, ypos + 4),
-        color=(0.75, 0.75, 0.75),
-        width=1
-    )
-
-    return ypos + h + line_gap
-
-def draw_checkbox(page, xpos, ypos, label, name, fontsize=def_fontsize):
-    h = line_height(pymupdf.Font(def_font), fontsize)
-    page.insert_text(
-        (xpos + h + 5, ypos),
-        label,
-        fontname=def_font,
-        fontsize=fontsize
-    )
-
-    widget = pymupdf.Widget()
-    widget.rect = pymupdf.Rect(xpos, ypos - h + 3, xpos + h, ypos + 3)
-    widget.field_name = name
-    widget.field_type = pymupdf.PDF_WIDGET_TYPE_CHECKBOX
-    widget.text_font = 'ZaDb'
-    widget.text_fontsize = 0
-    widget.border_color = (0, 0, 0)
-    widget.border_width = 1
-    page.add_widget(widget)
-    return ypos + h + line_gap
+# row items are placed at x offsets from the left margin
+
+financial_aid_form = {
+    "font": def_font,
+    "fontsize": def_fontsize,
+    "margin": margin,
+    "row_gap": line_gap,
+    "blocks": [
+        LETTERHEAD,
+
+        # --------------------
+        # Header
+        # --------------------
+        {"kind": "centered", "text": "Financial Aid Certification", "fontname": "Helvetica-Bold", "fontsize": def_fontsize + 8, "underline": True, "color": [0, 0, 0], "y": margin},
+        {"kind": "textbox", "y": 85, "height": 60, "text": (
+            "This form is required for nursing students to apply for funding through the "
+            "Allison Rose Memorial Fund scholarship program. The information the school of "
+            "nursing provides is strictly confidential and only used to verify cost of attendance."
+        )},
+
+        # --------------------
+        # Student section
+        # --------------------
+        {"kind": "row", "items": [{"label": "Student Name:", "width": 260, "fontname": "Helvetica-Bold"}]},
+        {"kind": "space", "height": 5},
+        {"kind": "row", "items": [{"label": "Student Signature to release information:", "width": 200, "signature": True, "fontname": "Helvetica-Bold"}]},
+        {"kind": "rule", "width": 3, "after": 10},
+
+        # --------------------
+        # Administrator section
+        # --------------------
+        {"kind": "lines", "valign": "top", "spacing": 20, "fontname": "Helvetica-Bold", "lines": ["To be completed by Financial Aid Administrator Only"]},
+        {"kind": "textbox", "height": 60, "text": "Please provide us with the most current information available at the school of nursing.  Completed forms may be emailed to applications@allisonrosememorialfund.org"},
+
+        {"kind": "row", "items": [{"label": "Total Annual Cost of Attendance (per semester, full-time) $", "width": 140, "gap": 2}]},
+        {"kind": "row", "items": [{"label": "For which academic year?", "width": 120}]},
+        {"kind": "row", "items": [
+            {"label": "Tuition / Fees $", "width": 120, "gap": 2},
+            {"x": 260, "label": "Books $", "width": 120, "gap": 2},
+        ]},
+        {"kind": "row", "items": [
+            {"label": "Room & Board $", "width": 120, "gap": 2},
+            {"x": 260, "label": "Other $", "width": 120, "gap": 2},
+        ]},
+
+        {"kind": "space", "height": 10},
+        {"kind": "row", "advance": 20, "items": [
+            {"text": "1. Has the student completed a FAFSA form?"},
+            {"x": 220, "checkbox": "fafsa_yes", "label": "Yes"},
+            {"x": 280, "checkbox": "fafsa_no", "label": "No"},
+        ]},
+        {"kind": "row", "items": [{"label": "2. Student Aid Index (SAI) from FAFSA", "width": 120, "gap": 2}]},
+        {"kind": "row", "items": [{"label": "3. Student ID #", "width": 200}]},
+        {"kind": "row", "items": [{"label": "4. Cumulative GPA (for current students, 4.0 scale)", "width": 200}]},
+
+        # Payment due dates
+        {"kind": "lines", "spacing": 18, "lines": ["5. Tuition payment due dates (to ensure timely disbursement):"]},
+        {"kind": "row", "items": [
+            {"x": 10, "label": "Fall:", "width": 80, "gap": 4},
+            {"x": 140, "label": "Spring:", "width": 80, "gap": 4},
+            {"x": 285, "label": "Summer (if applicable):", "width": 80, "gap": 4},
+        ]},
+
+        # Citizenship
+        {"kind": "row", "items": [
+            {"text": "6. Is the student a U.S. citizen or eligible non-citizen (per FAFSA)?"},
+            {"x": 310, "checkbox": "citizen_yes", "label": "Yes"},
+            {"x": 370, "checkbox": "citizen_no", "label": "No"},
+        ]},
+
+        # --------------------
+        # Administrator signature
+        # --------------------
+        {"kind": "space", "height": 30},
+        {"kind": "row", "items": [
+            {"label": "FAA Name", "width": 240},
+            {"x": 330, "label": "Title", "width": 100},
+        ]},
+        {"kind": "row", "items": [{"label": "E-Mail", "width": 280}]},
+        {"kind": "row", "items": [{"label": "Phone / Ext #", "width": 200}]},
+        {"kind": "row", "items": [{"label": "School", "width": 400}]},
+        {"kind": "row", "items": [
+            {"label": "Signature", "width": 300, "signature": True},
+            {"x": 380, "label": "Date", "width": 100},
+        ]},
+
+        # --------------------
+        # Bursar's Office
+        # --------------------
+        {"kind": "space", "height": 20},
+        {"kind": "textbox", "height": 40, "advance": 50, "text": "If this student is awarded a scholarship, checks are sent to the financial aid or bursar's office for deposit in the student's tuition account. Please indicate the mailing address where the check is to be mailed:"},
+        {"kind": "row", "items": [{"label": "Send to attention of:", "width": 300}]},
+        {"kind": "row", "items": [{"label": "Mailing Address", "width": 380}]},
+        {"kind": "row", "items": [
+            {"label": "City", "width": 200},
+            {"x": 250, "label": "State", "width": 80},
+            {"x": 380, "label": "Zip", "width": 80},
+        ]},
+
+        # --------------------
+        # Footer
+        # --------------------
+        {"kind": "space", "height": 10},
+        {"kind": "centered", "text": "Thank you for completing this form!", "fontname": "Helvetica-Oblique", "fontsize": def_fontsize + 2, "color": [0, 0, 0]},
+        FOOTER,
+    ],
+}
 
 # --------------------
 # Main generator
 # --------------------
-def main(output_path="forms/financial_aid_certification_v1.pdf"):
+def main(output_path="forms/financial_aid_certification_v1.pdf", profile=DEFAULT_PROFILE):
     doc = pymupdf.open()
-    page = doc.new_page()
-
-    r = page.bound()
-    xmax = r[2] - margin
-    ymax = r[3] - margin
-
-    ypos = margin
-
-    def insert_fund_name():
-        fontsize = def_fontsize
-        h = line_height(pymupdf.Font(def_font), fontsize)
-
-        text = 'Dr. Allison Rose'
-        text_length = pymupdf.get_text_length(text, fontname=def_font, fontsize=fontsize)
-        page.insert_text((xmax - text_length, h + margin), text, fontname=def_font, fontsize=fontsize)
-
-        text = 'Memorial Fund'
-        text_length = pymupdf.get_text_length(text, fontname=def_font, fontsize=fontsize)
-        page.insert_text((xmax - text_length, 2*h + margin), text, fontname=def_font, fontsize=fontsize)
-
-        text = 'A 501(c)(3) nonprofit organization'
-        text_length = pymupdf.get_text_length(text, fontname=def_font, fontsize=fontsize-2)
-        page.insert_text((xmax - text_length, 3*h + margin), text, fontname=def_font, fontsize=fontsize-2)
-
-    insert_fund_name()
-
-    # --------------------
-    # Header
-    # --------------------
-    title = "Financial Aid Certification"
-    insert_centered_text(title, page, ypos, xmax, fontname='Helvetica-Bold', fontsize=def_fontsize+8, underline=True)
-
-    ypos = 85
-
-    intro = (
-        "This form is required for nursing students to apply for funding through the "
-        "Allison Rose Memorial Fund scholarship program. The information the school of "
-        "nursing provides is strictly confidential and only used to verify cost of attendance."
-    )
-    page.insert_textbox(
-        (margin, ypos, xmax, ypos + 60),
-        intro,
-        fontname=def_font,
-        fontsize=def_fontsize
-    )
-    ypos += 60
-
-    # --------------------
-    # Student section
-    # --------------------
-    ypos = draw_label_and_form_field(page, margin, ypos, "Student Name:", 260, fontname='Helvetica-Bold')
-    ypos += 5
-    text = "Student Signature to release information:"
-    ypos = draw_label_and_form_field(page, margin, ypos, text, 200, signature=True, fontname='Helvetica-Bold')
-    page.draw_line((margin, ypos), (xmax, ypos), width=3)
-    ypos += 10
-
-    # --------------------
-    # Administrator section
-    # --------------------
-    page.insert_text(
-        (margin, ypos + line_height(pymupdf.Font(def_font), def_fontsize)),
-        "To be completed by Financial Aid Administrator Only",
-        fontname='Helvetica-Bold',
-        fontsize=def_fontsize
-    )
-    ypos += 20
-
-    text = "Please provide us with the most current information available at the school of nursing.  Completed forms may be emailed to applications@allisonrosememorialfund.org"
-    page.insert_textbox(
-        (margin, ypos, xmax, ypos + 60),
-        text,
-        fontname=def_font,
-        fontsize=def_fontsize
-    )
-    ypos += 60
-
-    ypos = draw_label_and_form_field(page, margin, ypos, "Total Annual Cost of Attendance (per semester, full-time) $", 140, gap=2)
-    ypos = draw_label_and_form_field(page, margin, ypos, 'For which academic year?', 120)
-    draw_label_and_form_field(page, margin, ypos, "Tuition / Fees $", 120, gap=2)
-    ypos = draw_label_and_form_field(page, margin + 260, ypos, "Books $", 120, gap=2)
-    draw_label_and_form_field(page, margin, ypos, "Room & Board $", 120, gap=2)
-    ypos = draw_label_and_form_field(page, margin + 260, ypos, "Other $", 120, gap=2)
-
-    ypos += 10
-    #text = "1. What is the per credit tuition rate for 2024-2025 at your school?  $"
-    #ypos = draw_label_and_form_field(page, margin, ypos, text, 150, gap=2)
-
-    page.insert_text(
-        (margin, ypos),
-        "1. Has the student completed a FAFSA form?",
-        fontname=def_font,
-        fontsize=def_fontsize
-    )
-    draw_checkbox(page, margin + 220, ypos, "Yes", "fafsa_yes")
-    draw_checkbox(page, margin + 280, ypos, "No", "fafsa_no")
-    ypos += 20
-
-    ypos = draw_label_and_form_field(
-        page, margin, ypos,
-        "2. Student Aid Index (SAI) from FAFSA",
-        120, gap=2
-    )
-
-    ypos = draw_label_and_form_field(page, margin, ypos, "3. Student ID #", 200)
-
-    ypos = draw_label_and_form_field(
-        page, margin, ypos,
-        "4. Cumulative GPA (for current students, 4.0 scale)",
-        200
-    )
-
-    # Payment due dates
-    page.insert_text((margin, ypos), "5. Tuition payment due dates (to ensure timely disbursement):", fontname=def_font, fontsize=def_fontsize)
-    ypos += 18
-    x = margin + 10
-    draw_label_and_form_field(page, x, ypos, "Fall:", 80, gap=4)
-    draw_label_and_form_field(page, x + 130, ypos, "Spring:", 80, gap=4)
-    ypos = draw_label_and_form_field(page, x + 275, ypos, "Summer (if applicable):", 80, gap=4)
-
-    # Citizenship
-    page.insert_text((margin, ypos), "6. Is the student a U.S. citizen or eligible non-citizen (per FAFSA)?", fontname=def_font, fontsize=def_fontsize)
-    draw_checkbox(page, margin + 310, ypos, "Yes", "citizen_yes")
-    ypos = draw_checkbox(page, margin + 370, ypos, "No", "citizen_no")
-
-    # --------------------
-    # Administrator signature
-    # --------------------
-    ypos += 30
-    draw_label_and_form_field(page, margin, ypos, "FAA Name", 240)
-    ypos = draw_label_and_form_field(page, 350, ypos, "Title", 100)
-    ypos = draw_label_and_form_field(page, margin, ypos, "E-Mail", 280)
-    ypos = draw_label_and_form_field(page, margin, ypos, "Phone / Ext #", 200)
-    ypos = draw_label_and_form_field(page, margin, ypos, "School", 400)
-    draw_label_and_form_field(page, margin, ypos, "Signature", 300, signature=True)
-    ypos = draw_label_and_form_field(page, 400, ypos, "Date", 100)
-
-    # --------------------
-    # Bursar's Office
-    # --------------------
-    ypos += 20
-    text = "If this student is awarded a scholarship, checks are sent to the financial aid or bursar's office for deposit in the student's tuition account. Please indicate the mailing address where the check is to be mailed:"
-    page.insert_textbox(
-        (margin, ypos, xmax, ypos + 40),
-        text,
-        fontname=def_font,
-        fontsize=def_fontsize
-    )
-    ypos += 50
-    ypos = draw_label_and_form_field(page, margin, ypos, "Send to attention of:", 300)
-    ypos = draw_label_and_form_field(page, margin, ypos, "Mailing Address", 380)
-    draw_label_and_form_field(page, margin, ypos, "City", 200)
-    draw_label_and_form_field(page, margin + 250, ypos, "State", 80)
-    ypos = draw_label_and_form_field(page, margin + 380, ypos, "Zip", 80)
-
-    # --------------------
-    # Footer
-    # --------------------
-    ypos += 10
-    text = "Thank you for completing this form!"
-    insert_centered_text(text, page, ypos, xmax, fontname='Helvetica-Oblique', fontsize=def_fontsize + 2)
-
-    text = 'applications@allisonrosememorialfund.org'
-    h = line_height(pymupdf.Font(def_font), def_fontsize - 2)
-    insert_centered_text(text, page, ymax - 2*h, xmax, fontsize=def_fontsize - 2)
-
-    text = 'Dr. Allison Rose Memorial Fund - https://allisonrosememorialfund.org'
-    h = line_height(pymupdf.Font(def_font), def_fontsize - 2)
-    insert_centered_text(text, page, ymax - h, xmax, fontsize=def_fontsize - 2)
+    render_spec(doc, financial_aid_form)
 
-    doc.save(output_path)
+    report = save_pdf(doc, output_path, profile, inputs=spec_inputs(financial_aid_form))
     doc.close()
-    print("Wrote", output_path)
+    print("Wrote", output_path, f"[{report}]")
+    print("Text metrics:", stats_summary())
 
 # --------------------
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Generate the financial aid certification form.")
+    add_profile_argument(parser)
+    main(profile=parser.parse_args().profile)
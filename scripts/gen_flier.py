@@ -1,7 +1,16 @@
 #!/usr/bin/env python3
 
+import argparse
+import json
+import os
+import re
+
 import pymupdf
 
+from form_layout import render_spec, spec_inputs
+from pdf_metrics import line_height, stats_summary
+from pdf_save import DEFAULT_PROFILE, add_profile_argument, save_pdf
+
 # references
 # * https://pymupdf.readthedocs.io/en/latest/widget.html
 
@@ -9,82 +18,120 @@ def_fontsize = 14
 margin = 30
 def_font = 'Helvetica'
 
-def insert_centered_text(text, page, y, xmax, fontname=def_font, fontsize=def_fontsize, underline=False, color=(0, 0, 0)):
-    text_length = pymupdf.get_text_length(text, fontname=fontname, fontsize=fontsize)
-    x = (xmax - text_length) / 2
-    h = line_height(pymupdf.Font(fontname), fontsize)
-    page.insert_text((x, y+h), text, fontname=fontname, fontsize=fontsize, color=color)
-    if underline:
-        page.draw_line((x, y+h+8), (x + text_length, y+h+8), color=color, width=1)
-        return y + h + 1
-    return y + h
-
-def create_application_form(output_path="forms/flier.pdf"):
+page_width, page_height = 595, 842
+xmax = page_width - margin
+ymax = page_height - margin
+
+icon_side = 80
+qr_side = 250
+qr_x0 = xmax/2 - qr_side/2  # center horizontally
+qr_y0 = ymax*0.65 - qr_side/2  # 65% down the page
+
+headline = ['Ready to Elevate', 'Your Career?']
+pitch = [
+    'If you\'re a NICU nurse, NNP school may be',
+    'closer than you think...',
+    '',
+    'Scholarships are available now through',
+    'the Dr Allison Rose Memorial Fund.',
+]
+campus_fontsize = def_fontsize+4
+
+def flier_spec(headline=headline, campus=None, qr="img/qr.png", url="https://www.allisonrosememorialfund.org/"):
+    """Flier layout; a campaign variant changes only the headline, campus line and QR code."""
+    if campus:
+        # sits in the gap under the headline so the rest of the page doesn't move
+        gap = [
+            {"kind": "centered", "text": campus, "fontsize": campus_fontsize, "color": [0.4, 0.4, 0.4]},
+            {"kind": "space", "height": 60 - line_height(def_font, campus_fontsize)},
+        ]
+    else:
+        gap = [{"kind": "space", "height": 60}]
+
+    return {
+        "font": def_font,
+        "fontsize": def_fontsize,
+        "margin": margin,
+        "blocks": [
+            {"kind": "image", "rect": [margin/2, margin, margin/2 + icon_side, margin + icon_side], "file": "img/stethoscope.png"},
+            {"kind": "image", "rect": [xmax - margin/2 - icon_side, margin, xmax - margin/2, margin + icon_side], "file": "img/mortarboard.png"},
+
+            {"kind": "centered", "text": headline[0], "fontsize": def_fontsize+24, "y": margin},
+            *[{"kind": "centered", "text": line, "fontsize": def_fontsize+24} for line in headline[1:]],
+            *gap,
+            *[{"kind": "centered", "text": line, "fontsize": def_fontsize+10} for line in pitch],
+
+            {"kind": "image", "rect": [qr_x0, qr_y0, qr_x0 + qr_side, qr_y0 + qr_side], "file": qr},
+            {"kind": "centered", "text": "Scan for eligibility & application details", "fontsize": def_fontsize+6, "y": qr_y0 + qr_side - 10},
+            {"kind": "centered", "text": url, "fontsize": def_fontsize+6},
+            {"kind": "space", "height": 40},
+            {"kind": "centered", "text": "Dr. Allison Rose Memorial Fund, Inc.", "fontsize": def_fontsize-2, "color": [0.4, 0.4, 0.4]},
+            {"kind": "centered", "text": "501(c)(3) nonprofit organization", "fontsize": def_fontsize-2, "color": [0.4, 0.4, 0.4]},
+        ],
+    }
+
+def create_application_form(output_path="forms/flier.pdf", profile=DEFAULT_PROFILE):
     doc = pymupdf.open()  # Create a new PDF document
-    page = doc.new_page() # Add a new page
-
-    r = page.bound()
-    xmax = r[2] - margin
-    ymax = r[3] - margin
-
-    side_len = 80
-    img_rect = pymupdf.Rect(margin/2, margin, margin/2 + side_len, margin + side_len)
-    page.insert_image(img_rect, filename="img/stethoscope.png")
-
-    side_len = 80
-    img_rect = pymupdf.Rect(xmax - margin/2 - side_len, margin, xmax - margin/2, margin + side_len)
-    page.insert_image(img_rect, filename="img/mortarboard.png")
-
-    text = 'Ready to Elevate'
-    ypos = insert_centered_text(text, page, margin, xmax, fontsize=def_fontsize+24)
-
-    text = 'Your Career?'
-    ypos = insert_centered_text(text, page, ypos, xmax, fontsize=def_fontsize+24)
-
-    ypos += 60
-
-    lines = [
-        'If you\'re a NICU nurse, NNP school may be',
-        'closer than you think...',
-        '',
-        'Scholarships are available now through',
-        'the Dr Allison Rose Memorial Fund.',
-    ]
-
-    for i, line in enumerate(lines):
-        ypos = insert_centered_text(line, page, ypos, xmax, fontsize=def_fontsize+10)
+    spec = flier_spec()
+    render_spec(doc, spec, page_width, page_height)
 
-    side_len = 250
-    qr_x0 = xmax/2 - side_len/2  # center horizontally
-    qr_y0 = ymax*0.65 - side_len/2  # 65% down the page
-
-    img_rect = pymupdf.Rect(qr_x0, qr_y0, qr_x0 + side_len, qr_y0 + side_len)
-    page.insert_image(img_rect, filename="img/qr.png")
-
-    text = 'Scan for eligibility & application details'
-    ypos = insert_centered_text(text, page, qr_y0 + side_len - 10, xmax, fontsize=def_fontsize+6)
-
-    text = 'https://www.allisonrosememorialfund.org/'
-    ypos = insert_centered_text(text, page, ypos, xmax, fontsize=def_fontsize+6)
-
-    ypos += 40
-
-    text = 'Dr. Allison Rose Memorial Fund, Inc.'
-    ypos = insert_centered_text(text, page, ypos, xmax, fontsize=def_fontsize-2, color=(0.4, 0.4, 0.4))
-
-    text = '501(c)(3) nonprofit organization'
-    ypos = insert_centered_text(text, page, ypos, xmax, fontsize=def_fontsize-2, color=(0.4, 0.4, 0.4))
-
-    doc.save(output_path)
+    report = save_pdf(doc, output_path, profile, inputs=spec_inputs(spec, page_width, page_height))
+    doc.close()
+    print("Wrote", output_path, f"[{report}]")
+    print("Text metrics:", stats_summary())
+
+def render_variants(variants):
+    """Render one page per variant into a single document.
+
+    Variants are dicts of flier_spec() arguments (headline, campus, qr, url).
+    Images shared between variants (the icons, and any repeated QR code) are
+    embedded once and every page refers to that copy.
+    """
+    doc = pymupdf.open()
+    images = {}
+    for variant in variants:
+        render_spec(doc, flier_spec(**variant), page_width, page_height, images)
+    return doc
+
+def variant_name(variant, index):
+    name = re.sub(r"[^a-z0-9]+", "_", str(variant.get("campus", "")).lower()).strip("_")
+    return f"flier_{index:03d}_{name}.pdf" if name else f"flier_{index:03d}.pdf"
+
+def create_flier_variants(variants_path, output_path=None, output_dir="forms/fliers", profile=DEFAULT_PROFILE):
+    """Write every variant in variants_path (JSON list) to one PDF, or one PDF each."""
+    with open(variants_path) as f:
+        variants = json.load(f)
+    doc = render_variants(variants)
+
+    specs = [flier_spec(**variant) for variant in variants]
+    if output_path:
+        report = save_pdf(doc, output_path, profile, inputs={"pages": [spec_inputs(spec, page_width, page_height) for spec in specs]})
+        print(f"Wrote {len(variants)} flier(s) to {output_path} [{report}]")
+    else:
+        os.makedirs(output_dir, exist_ok=True)
+        for i, variant in enumerate(variants):
+            # copying the page carries the already-embedded images along,
+            # rather than decoding the PNGs again for every flier
+            single = pymupdf.open()
+            single.insert_pdf(doc, from_page=i, to_page=i)
+            path = os.path.join(output_dir, variant_name(variant, i + 1))
+            report = save_pdf(single, path, profile, measure=False, inputs=spec_inputs(specs[i], page_width, page_height))
+            single.close()
+            print("Wrote", path, f"[{report}]")
     doc.close()
-    print("Wrote", output_path)
-
-def line_height(font, fontsize):
-    h = font.ascender - font.descender # Relative to fontsize 1
-    return h * fontsize
 
 def main():
-    create_application_form()
+    parser = argparse.ArgumentParser(description="Generate the recruiting flier.")
+    parser.add_argument("--variants", help="JSON list of variants ({\"campus\", \"headline\", \"qr\", \"url\"}) to render")
+    parser.add_argument("--output", help="write all variants into this one PDF")
+    parser.add_argument("--output-dir", default="forms/fliers", help="otherwise, one PDF per variant here (default: %(default)s)")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    if args.variants:
+        create_flier_variants(args.variants, args.output, args.output_dir, args.profile)
+    else:
+        create_application_form(profile=args.profile)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""Render preview thumbnails of the PDFs the website serves.
+
+    python scripts/gen_previews.py                    first page of every PDF under docs/
+    python scripts/gen_previews.py --pages all --widths 200 400 800
+
+Each page is rasterized with page.get_pixmap() at every requested width, in
+a process pool, and written as WebP (or PNG) to docs/previews/.  Renders are
+cached in .cache/previews/ by the PDF's content hash and the render settings,
+so a filing that hasn't changed is never rasterized again.
+
+docs/_data/previews.json indexes the thumbnails for Jekyll, keyed by the
+PDF's path under docs/.  A run updates the entries of the PDFs it rendered
+and drops those of PDFs that no longer exist, keeping the rest; images in
+docs/previews/ that the index no longer names are deleted:
+
+    {% assign preview = site.data.previews["irsforms/form1023.pdf"].previews[0] %}
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+import pymupdf
+from PIL import Image
+
+site_dir = "docs"
+output_dir = "docs/previews"
+index_path = "docs/_data/previews.json"
+cache_dir = ".cache/previews"
+
+DEFAULT_WIDTHS = (200, 400)
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cache_key(pdf_sha, page, width, fmt, quality):
+    return hashlib.sha256(f"{pdf_sha}|{page}|{width}|{fmt}|{quality}".encode()).hexdigest()
+
+
+def encode(pix, fmt, quality):
+    if fmt == "png":
+        return pix.tobytes("png")
+    image = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+    buf = io.BytesIO()
+    image.save(buf, "WEBP", quality=quality, method=6)
+    return buf.getvalue()
+
+
+def render_page(job):
+    """Worker: rasterize one page at each (width, cache path) that isn't cached yet."""
+    path, page_number, targets, fmt, quality = job
+    with pymupdf.open(path) as doc:
+        page = doc[page_number - 1]
+        for width, cached in targets:
+            zoom = width / page.rect.width
+            pix = page.get_pixmap(matrix=pymupdf.Matrix(zoom, zoom), alpha=False)
+            tmp = f"{cached}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(encode(pix, fmt, quality))
+            os.replace(tmp, cached)
+    return len(targets)
+
+
+def find_pdfs(root=site_dir):
+    for dirpath, dirnames, files in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith(("_", ".")))
+        for name in sorted(files):
+            if name.lower().endswith(".pdf"):
+                yield os.path.join(dirpath, name)
+
+
+def preview_name(rel_path, page, width, fmt):
+    stem = re.sub(r"[^a-z0-9]+", "-", os.path.splitext(rel_path)[0].lower()).strip("-")
+    return f"{stem}-p{page}-w{width}.{fmt}"
+
+
+def read_index():
+    try:
+        with open(index_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def generate_previews(pdfs, widths=DEFAULT_WIDTHS, all_pages=False, fmt="webp", quality=80, workers=None):
+    """Render previews for the given PDFs (paths under docs/) and update the site index."""
+    os.makedirs(cache_dir, exist_ok=True)
+    os.makedirs(output_dir, exist_ok=True)
+
+    index, jobs, outputs = read_index(), [], []
+    index = {rel: entry for rel, entry in index.items() if os.path.exists(os.path.join(site_dir, rel))}
+    for path in pdfs:
+        pdf_sha = file_sha256(path)
+        rel = os.path.relpath(path, site_dir).replace(os.sep, "/")
+        with pymupdf.open(path) as doc:
+            index[rel] = {"sha256": pdf_sha, "pages": len(doc), "previews": []}
+            for page in range(1, (len(doc) if all_pages else 1) + 1):
+                rect = doc[page - 1].rect
+                missing = []
+                for width in widths:
+                    cached = os.path.join(cache_dir, f"{cache_key(pdf_sha, page, width, fmt, quality)}.{fmt}")
+                    if not os.path.exists(cached):
+                        missing.append((width, cached))
+                    name = preview_name(rel, page, width, fmt)
+                    outputs.append((cached, os.path.join(output_dir, name)))
+                    index[rel]["previews"].append({
+                        "page": page, "width": width, "height": round(rect.height * width / rect.width),
+                        "src": f"/{os.path.relpath(output_dir, site_dir)}/{name}",
+                    })
+                if missing:
+                    jobs.append((path, page, missing, fmt, quality))
+
+    # only pages with uncached sizes go to the pool
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rendered = sum(pool.map(render_page, jobs))
+    else:
+        rendered = 0
+
+    copied = 0
+    for cached, out in outputs:
+        if not os.path.exists(out) or file_sha256(out) != file_sha256(cached):
+            shutil.copyfile(cached, out)
+            copied += 1
+
+    # previews of PDFs that are gone, or of sizes and formats no longer rendered
+    referenced = {os.path.basename(p["src"]) for entry in index.values() for p in entry["previews"]}
+    removed = 0
+    for name in os.listdir(output_dir):
+        if name.endswith((".webp", ".png")) and name not in referenced:
+            os.remove(os.path.join(output_dir, name))
+            removed += 1
+
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    with open(index_path, "w") as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"{len(pdfs)} PDF(s): rendered {rendered} new image(s), updated {copied} and removed {removed} preview(s); {len(index)} PDF(s) indexed in {index_path}")
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render preview thumbnails for the website's PDFs.")
+    parser.add_argument("pdfs", nargs="*", help=f"PDFs under {site_dir}/ (default: all of them)")
+    parser.add_argument("--widths", type=int, nargs="+", default=list(DEFAULT_WIDTHS), help="thumbnail widths in pixels (default: %(default)s)")
+    parser.add_argument("--pages", choices=["first", "all"], default="first", help="which pages to render (default: %(default)s)")
+    parser.add_argument("--format", choices=["webp", "png"], default="webp")
+    parser.add_argument("--quality", type=int, default=80, help="WebP quality (default: %(default)s)")
+    parser.add_argument("--workers", type=int, help="number of worker processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    generate_previews(args.pdfs or list(find_pdfs()), args.widths, args.pages == "all", args.format, args.quality, args.workers)
+
+
+if __name__ == "__main__":
+    main()
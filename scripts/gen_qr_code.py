@@ -1,12 +1,142 @@
 #!/usr/bin/env python3
 
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlencode
+
 import qrcode
+import qrcode.image.svg
+
+site_url = 'https://allisonrosememorialfund.org/'
+cache_dir = '.cache/qr'
+
+error_corrections = {
+    'L': qrcode.constants.ERROR_CORRECT_L,
+    'M': qrcode.constants.ERROR_CORRECT_M,
+    'Q': qrcode.constants.ERROR_CORRECT_Q,
+    'H': qrcode.constants.ERROR_CORRECT_H,
+}
+
+def render_qr(url, path, error_correction='M', box_size=10, fmt='png'):
+    qr = qrcode.QRCode(error_correction=error_corrections[error_correction], box_size=box_size)
+    qr.add_data(url)
+    qr.make(fit=True)
+    factory = qrcode.image.svg.SvgPathImage if fmt == 'svg' else None
+    img = qr.make_image(image_factory=factory)
+    tmp = f"{path}.tmp"
+    with open(tmp, 'wb') as f:
+        img.save(f)
+    os.replace(tmp, path)
+    return path
+
+def cache_key(url, error_correction, box_size, fmt):
+    return hashlib.sha256(f"{url}|{error_correction}|{box_size}|{fmt}".encode()).hexdigest()
+
+def tracked_url(campus, campaign=None, base_url=site_url):
+    params = {'src': campus}
+    if campaign:
+        params['campaign'] = campaign
+    return f"{base_url}?{urlencode(params)}"
+
+def slug(text):
+    return re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')
+
+def read_targets(path):
+    """Return [(name, url)] from a campaigns JSON file or a text file of URLs.
+
+    campaigns JSON: {"base_url": "...", "campaigns": {"fall-2026": ["emory", "duke"]}}
+    text file: one "url" or "name url" per line
+    """
+    targets = []
+    with open(path) as f:
+        if path.lower().endswith('.json'):
+            spec = json.load(f)
+            base_url = spec.get('base_url', site_url)
+            for campaign, campuses in spec['campaigns'].items():
+                for campus in campuses:
+                    targets.append((f"{slug(campaign)}_{slug(campus)}", tracked_url(campus, campaign, base_url)))
+        else:
+            for line in f:
+                parts = line.split()
+                if not parts or parts[0].startswith('#'):
+                    continue
+                url = parts[-1]
+                name = parts[0] if len(parts) > 1 else hashlib.sha256(url.encode()).hexdigest()[:12]
+                targets.append((slug(name), url))
+    return targets
+
+def _render_job(job):
+    url, path, error_correction, box_size, fmt = job
+    return render_qr(url, path, error_correction, box_size, fmt)
+
+def generate_batch(targets, output_dir='img/qr', formats=('png', 'svg'), error_correction='M', box_size=10, workers=None):
+    """Render a QR code per (name, url) and format, skipping any already in the cache.
+
+    Codes are content-addressed in .cache/qr by (url, error correction, size,
+    format); output files are only rewritten when their code changed.  Writes
+    output_dir/manifest.json mapping each URL to its files.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, 'manifest.json')
+    try:
+        with open(manifest_path) as f:
+            old = {path: info['key'] for entry in json.load(f).values() for path, info in entry['files'].items()}
+    except (OSError, ValueError, KeyError):
+        old = {}
+
+    manifest = {}
+    jobs = []
+    pending = set()
+    copies = []
+    for name, url in targets:
+        files = {}
+        for fmt in formats:
+            key = cache_key(url, error_correction, box_size, fmt)
+            cached = os.path.join(cache_dir, f"{key}.{fmt}")
+            out = os.path.join(output_dir, f"{name}.{fmt}")
+            files[out] = {'key': key}
+            if cached not in pending and not os.path.exists(cached):
+                pending.add(cached)
+                jobs.append((url, cached, error_correction, box_size, fmt))
+            if old.get(out) != key or not os.path.exists(out):
+                copies.append((cached, out))
+        manifest[url] = {'name': name, 'files': files}
+
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(_render_job, jobs, chunksize=8))
+    for cached, out in copies:
+        shutil.copyfile(cached, out)
+
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    print(f"{len(targets)} URL(s): rendered {len(jobs)} new code(s), updated {len(copies)} file(s); manifest in {manifest_path}")
+    return manifest
 
 def main():
-    data_to_encode = 'https://allisonrosememorialfund.org/'
+    parser = argparse.ArgumentParser(description="Generate QR codes for the fund's website.")
+    parser.add_argument('targets', nargs='?', help="campaigns JSON or text file of URLs to render in batch")
+    parser.add_argument('--output-dir', default='img/qr', help="batch output directory (default: %(default)s)")
+    parser.add_argument('--format', action='append', choices=['png', 'svg'], help="output format(s) (default: png and svg)")
+    parser.add_argument('--error-correction', default='M', choices=sorted(error_corrections))
+    parser.add_argument('--box-size', type=int, default=10, help="pixels per module (default: %(default)s)")
+    parser.add_argument('--workers', type=int, help="number of worker processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    if args.targets:
+        generate_batch(read_targets(args.targets), args.output_dir, args.format or ('png', 'svg'),
+                       args.error_correction, args.box_size, args.workers)
+        return
+
     filename = 'img/qr.png'
-    img = qrcode.make(data_to_encode)
-    img.save(filename)
+    render_qr(site_url, filename)
 
     print(f"QR code generated and saved as {filename}")
 
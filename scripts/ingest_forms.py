@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""Extract widget values from returned application / financial-aid PDFs into Parquet tables.
+
+Every PDF under the input directory is hashed and read in a worker process;
+only the widget values travel back, so no document stays open longer than it
+takes to read its fields.  Rows are written as Parquet part files, one
+dataset directory per form type:
+
+    data/forms/application/part-<timestamp>-<uuid>.parquet
+    data/forms/financial_aid/part-<timestamp>-<uuid>.parquet
+
+Re-running is incremental: files whose content hash is already in a table
+are skipped.  So are files that aren't a known form or can't be read: their
+hashes are kept in data/forms/_skipped.parquet, so they are never reopened.
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import pandas as pd
+import pymupdf
+
+# widget name -> (column, dtype); dtype is "string", "float" or "bool"
+FORM_TYPES = {
+    "application": {
+        "marker": "fullname_field",
+        "columns": {
+            "fullname_field": ("full_name", "string"),
+            "addr_field": ("address", "string"),
+            "addr2_field": ("address2", "string"),
+            "city_field": ("city", "string"),
+            "state_field": ("state", "string"),
+            "zip_field": ("zip", "string"),
+            "phone_field": ("phone", "string"),
+            "email_field": ("email", "string"),
+            "program_field": ("program", "string"),
+            "current_fulltime_check": ("current_fulltime", "bool"),
+            "current_parttime_check": ("current_parttime", "bool"),
+            "applying_fulltime_check": ("applying_fulltime", "bool"),
+            "applying_parttime_check": ("applying_parttime", "bool"),
+            "applying_other_check": ("applying_other", "bool"),
+            "applying_other_field1": ("other_explanation1", "string"),
+            "applying_other_field2": ("other_explanation2", "string"),
+            "start_date_field": ("start_date", "string"),
+            "fulltime_field": ("planned_fulltime", "bool"),
+            "parttime_field": ("planned_parttime", "bool"),
+            "parttime_details_year1_field": ("parttime_details_year1", "string"),
+            "parttime_details_year2_field": ("parttime_details_year2", "string"),
+            "parttime_details_year3_field": ("parttime_details_year3", "string"),
+        },
+    },
+    "financial_aid": {
+        "marker": "fafsa_yes",
+        "columns": {
+            "Student Name:": ("student_name", "string"),
+            "Total Annual Cost of Attendance (per semester, full-time) $": ("cost_of_attendance", "float"),
+            "For which academic year?": ("academic_year", "string"),
+            "Tuition / Fees $": ("tuition_fees", "float"),
+            "Books $": ("books", "float"),
+            "Room & Board $": ("room_board", "float"),
+            "Other $": ("other_costs", "float"),
+            "fafsa_yes": ("fafsa_yes", "bool"),
+            "fafsa_no": ("fafsa_no", "bool"),
+            "2. Student Aid Index (SAI) from FAFSA": ("sai", "float"),
+            "3. Student ID #": ("student_id", "string"),
+            "4. Cumulative GPA (for current students, 4.0 scale)": ("gpa", "float"),
+            "Fall:": ("fall_due", "string"),
+            "Spring:": ("spring_due", "string"),
+            "Summer (if applicable):": ("summer_due", "string"),
+            "citizen_yes": ("citizen_yes", "bool"),
+            "citizen_no": ("citizen_no", "bool"),
+            "FAA Name": ("faa_name", "string"),
+            "Title": ("faa_title", "string"),
+            "E-Mail": ("faa_email", "string"),
+            "Phone / Ext #": ("faa_phone", "string"),
+            "School": ("school", "string"),
+            "Date": ("faa_date", "string"),
+            "Send to attention of:": ("send_attention", "string"),
+            "Mailing Address": ("mailing_address", "string"),
+            "City": ("mailing_city", "string"),
+            "State": ("mailing_state", "string"),
+            "Zip": ("mailing_zip", "string"),
+        },
+    },
+}
+
+SOURCE_COLUMNS = ["source_path", "source_sha256", "ingested_at"]
+
+# hashes of PDFs that aren't a known form, so later runs don't reopen them
+SKIPPED_FILE = "_skipped.parquet"
+
+_known_hashes = frozenset()
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def read_widgets(path: str) -> dict[str, object]:
+    """Return {field name: value} for every widget in the PDF; checkboxes become bools."""
+    values = {}
+    with pymupdf.open(path) as doc:
+        for page in doc:
+            for widget in page.widgets():
+                value = widget.field_value
+                if widget.field_type == pymupdf.PDF_WIDGET_TYPE_CHECKBOX:
+                    value = value not in (None, "", "Off", False)
+                values[widget.field_name] = value
+    return values
+
+
+def detect_form_type(values: dict) -> str | None:
+    for form_type, schema in FORM_TYPES.items():
+        if schema["marker"] in values:
+            return form_type
+    return None
+
+
+def extract_file(path: str) -> tuple[str, str, str | None, dict | None]:
+    """Worker: (path, sha256, form type, row) -- row is None for skipped files."""
+    digest = file_sha256(path)
+    if digest in _known_hashes:
+        return path, digest, None, None
+    try:
+        values = read_widgets(path)
+    except (RuntimeError, ValueError) as e:  # not a readable PDF
+        print(f"Skipping {path}: {e}", file=sys.stderr)
+        return path, digest, None, None
+
+    form_type = detect_form_type(values)
+    if form_type is None:
+        return path, digest, None, None
+    row = {column: values.get(name) for name, (column, _) in FORM_TYPES[form_type]["columns"].items()}
+    return path, digest, form_type, row
+
+
+def _init_worker(known_hashes):
+    global _known_hashes
+    _known_hashes = known_hashes
+
+
+def to_frame(form_type: str, rows: list[dict]) -> pd.DataFrame:
+    """Build a typed DataFrame for one form type from raw widget rows."""
+    df = pd.DataFrame(rows)
+    for column, dtype in FORM_TYPES[form_type]["columns"].values():
+        if column not in df:
+            df[column] = None
+        series = df[column]
+        if dtype == "float":
+            cleaned = series.astype("string").str.replace(r"[$,\s]", "", regex=True)
+            df[column] = pd.to_numeric(cleaned, errors="coerce").astype("Float64")
+        elif dtype == "bool":
+            df[column] = series.astype("boolean")
+        else:
+            df[column] = series.astype("string").str.strip().replace("", pd.NA)
+    df["source_path"] = df["source_path"].astype("string")
+    df["source_sha256"] = df["source_sha256"].astype("string")
+    df["ingested_at"] = pd.to_datetime(df["ingested_at"], utc=True)
+    columns = [column for column, _ in FORM_TYPES[form_type]["columns"].values()]
+    return df[columns + SOURCE_COLUMNS]
+
+
+def load_table(output_dir: str, form_type: str, columns=None) -> pd.DataFrame | None:
+    path = os.path.join(output_dir, form_type)
+    if not os.path.isdir(path) or not any(name.endswith(".parquet") for name in os.listdir(path)):
+        return None
+    return pd.read_parquet(path, columns=columns)
+
+
+def load_skipped(output_dir: str, columns=None) -> pd.DataFrame | None:
+    """Files seen before that weren't a known form (or weren't readable)."""
+    path = os.path.join(output_dir, SKIPPED_FILE)
+    return pd.read_parquet(path, columns=columns) if os.path.exists(path) else None
+
+
+def record_skipped(output_dir: str, rows: list[dict]):
+    if not rows:
+        return
+    df = pd.DataFrame(rows).astype({"source_path": "string", "source_sha256": "string"})
+    df["ingested_at"] = pd.to_datetime(df["ingested_at"], utc=True)
+    existing = load_skipped(output_dir)
+    if existing is not None:
+        df = pd.concat([existing, df], ignore_index=True)
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, SKIPPED_FILE)
+    tmp = f"{path}.tmp"
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def ingested_hashes(output_dir: str) -> set[str]:
+    """Content hashes of every file already ingested or skipped."""
+    hashes = set()
+    for form_type in FORM_TYPES:
+        df = load_table(output_dir, form_type, columns=["source_sha256"])
+        if df is not None:
+            hashes.update(df["source_sha256"].dropna())
+    skipped = load_skipped(output_dir, columns=["source_sha256"])
+    if skipped is not None:
+        hashes.update(skipped["source_sha256"].dropna())
+    return hashes
+
+
+def find_pdfs(input_dir: str):
+    for root, _, files in os.walk(input_dir):
+        for name in sorted(files):
+            if name.lower().endswith(".pdf"):
+                yield os.path.join(root, name)
+
+
+class _PartWriter:
+    """Buffers rows per form type and writes them out as Parquet part files."""
+
+    def __init__(self, output_dir: str, flush_rows: int):
+        self.output_dir = output_dir
+        self.flush_rows = flush_rows
+        self.rows = {form_type: [] for form_type in FORM_TYPES}
+        self.stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+
+    def add(self, form_type: str, row: dict):
+        self.rows[form_type].append(row)
+        if len(self.rows[form_type]) >= self.flush_rows:
+            self.flush(form_type)
+
+    def flush(self, form_type: str):
+        rows = self.rows[form_type]
+        if not rows:
+            return
+        path = os.path.join(self.output_dir, form_type)
+        os.makedirs(path, exist_ok=True)
+        # the uuid keeps runs started in the same second from overwriting each other's parts;
+        # the dot-prefixed temp name is ignored by readers until it's complete
+        name = f"part-{self.stamp}-{uuid.uuid4().hex}.parquet"
+        tmp = os.path.join(path, f".{name}.tmp")
+        to_frame(form_type, rows).to_parquet(tmp, index=False)
+        os.replace(tmp, os.path.join(path, name))
+        self.rows[form_type] = []
+
+    def close(self):
+        for form_type in FORM_TYPES:
+            self.flush(form_type)
+
+
+def ingest(input_dir: str, output_dir: str = "data/forms", workers: int | None = None, flush_rows: int = 5000) -> dict[str, int]:
+    """Ingest every new PDF under input_dir; return counts by outcome / form type."""
+    known = ingested_hashes(output_dir)
+    counts = {"skipped": 0, "unrecognized": 0, **{form_type: 0 for form_type in FORM_TYPES}}
+    writer = _PartWriter(output_dir, flush_rows)
+    ingested_at = datetime.now(timezone.utc)
+    unrecognized = []
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(frozenset(known),)) as pool:
+        for path, digest, form_type, row in pool.map(extract_file, find_pdfs(input_dir), chunksize=16):
+            if digest in known:
+                counts["skipped"] += 1
+                continue
+            known.add(digest)  # also dedupes copies of the same file within this run
+            if form_type is None:
+                unrecognized.append({"source_path": path, "source_sha256": digest, "ingested_at": ingested_at})
+                counts["unrecognized"] += 1
+                continue
+            row.update(source_path=path, source_sha256=digest, ingested_at=ingested_at)
+            writer.add(form_type, row)
+            counts[form_type] += 1
+
+    writer.close()
+    record_skipped(output_dir, unrecognized)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract submitted form fields into Parquet tables.")
+    parser.add_argument("input_dir", help="directory of returned PDFs (searched recursively)")
+    parser.add_argument("--output-dir", default="data/forms", help="where the per-form-type tables live (default: %(default)s)")
+    parser.add_argument("--workers", type=int, help="number of worker processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    counts = ingest(args.input_dir, args.output_dir, args.workers)
+    print(", ".join(f"{name}: {n}" for name, n in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
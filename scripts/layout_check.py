@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""Find overlapping or off-page text, widgets and images in the forms.
+
+    python scripts/layout_check.py                        the built-in form specs
+    python scripts/layout_check.py --variants variants.json
+    python scripts/layout_check.py forms/ forms/renewals/report.pdf
+
+Without arguments, every form spec is compiled and its drawing operations
+checked -- nothing is rendered, so hundreds of flier variants take a second
+or two.  Given PDFs (or directories of them), the rendered pages are checked
+instead, from their text spans, widgets, images and drawings, in a process
+pool.  As a library, check_layout() takes a compiled layout and
+check_document() an open document.
+
+Text (measured by its glyphs' ink, not the line box), widgets, textboxes and
+images must not overlap each other; nothing may run past the page.  Rules
+and underlines are only checked against the page edges, since they sit under
+fields and section titles by design.  On rendered pages, text lying
+entirely inside a widget (its value) or an image (a scan's text layer)
+isn't a collision.  A compiled layout has no values, so there a label that
+lands inside another field is reported like any other overlap.
+
+Collisions are found with a sweep over y -- items sorted by top edge, an
+active set ordered by bottom edge -- so a page of n items costs O(n log n)
+plus the rows it actually has to compare.
+"""
+
+import argparse
+import heapq
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import pymupdf
+
+from form_layout import compile_layout, page_height, page_width
+from ingest_forms import find_pdfs
+from pdf_metrics import get_font, text_length
+
+# items of these kinds may not overlap one another
+SOLID = {"text", "widget", "textbox", "image"}
+
+# overlaps and overhangs up to this many points are ignored
+TOLERANCE = 1.0
+
+
+@lru_cache(maxsize=4096)
+def ink_extent(text: str, fontname: str) -> tuple[float, float]:
+    """(top, bottom) of the glyphs' ink relative to the baseline, for fontsize 1.
+
+    Tighter than the ascender / descender line box, so large headings and
+    text tucked into an image's margin aren't reported for overlap they don't have.
+    """
+    font = get_font(fontname)
+    boxes = [font.glyph_bbox(ord(c)) for c in text if not c.isspace()]
+    if not boxes:
+        return 0.0, 0.0
+    return max(box.y1 for box in boxes), min(box.y0 for box in boxes)
+
+
+@lru_cache(maxsize=1024)
+def textbox_height(width: float, height: float, text: str, fontname: str, fontsize: float) -> float:
+    """How much of a width x height textbox the wrapped text fills (the rest may hold other items)."""
+    with pymupdf.open() as doc:
+        unused = doc.new_page().insert_textbox((0, 0, width, height), text, fontname=fontname, fontsize=fontsize)
+    return height - unused  # unused is negative when the text overflows the box
+
+
+def op_items(ops, out=None):
+    """(kind, x0, y0, x1, y1, label) for every compiled drawing operation."""
+    out = [] if out is None else out
+    for op in ops:
+        kind = op[0]
+        if kind == "stamp":
+            op_items(op[1], out)
+        elif kind == "text":
+            _, x, y, text, fontname, fontsize, _ = op
+            if text.strip():
+                top, bottom = ink_extent(text, fontname)
+                out.append(("text", x, y - top * fontsize, x + text_length(text, fontname, fontsize), y - bottom * fontsize, text))
+        elif kind == "line":
+            _, x0, y0, x1, y1, _, width = op
+            out.append(("line", min(x0, x1), min(y0, y1) - width / 2, max(x0, x1), max(y0, y1) + width / 2, "line"))
+        elif kind == "textbox":
+            _, x0, y0, x1, y1, text, fontname, fontsize = op
+            out.append(("textbox", x0, y0, x1, y0 + textbox_height(x1 - x0, y1 - y0, text, fontname, fontsize), text[:30]))
+        elif kind == "widget":
+            out.append(("widget", *op[1:5], op[5]))
+        elif kind == "image":
+            out.append(("image", *op[1:5], op[5]))
+    return out
+
+
+def page_items(page: pymupdf.Page):
+    """The same items, read back from a rendered page."""
+    items = []
+    for block in page.get_text("dict", flags=pymupdf.TEXT_ACCURATE_BBOXES)["blocks"]:
+        for line in block.get("lines", []):
+            for span in line["spans"]:
+                if span["text"].strip():
+                    items.append(("text", *span["bbox"], span["text"]))
+    for widget in page.widgets():
+        items.append(("widget", *widget.rect, widget.field_name))
+    for image in page.get_image_info():
+        items.append(("image", *image["bbox"], f"image {image['number']}"))
+    for drawing in page.get_drawings():
+        items.append(("line", *drawing["rect"], "drawing"))
+    return items
+
+
+def overlaps(items, tolerance=TOLERANCE, rendered=False):
+    """Pairs of solid items whose rectangles overlap by more than tolerance both ways.
+
+    rendered: the items were read back from a page (page_items()), so text
+    may be a widget's value or an image's text layer.
+    """
+    solid = sorted((item for item in items if item[0] in SOLID), key=lambda item: item[2])
+    active = []  # (bottom, index) of items that reach below the current top edge
+    pairs = []
+    for i, item in enumerate(solid):
+        _, x0, y0, x1, y1, _ = item
+        while active and active[0][0] <= y0 + tolerance:
+            heapq.heappop(active)
+        for _, j in active:
+            other = solid[j]
+            dx = min(x1, other[3]) - max(x0, other[1])
+            dy = min(y1, other[4]) - max(y0, other[2])
+            if dx > tolerance and dy > tolerance and not _layered(item, other, rendered):
+                pairs.append((other, item, dx, dy))
+        heapq.heappush(active, (y1, i))
+    return pairs
+
+
+def _layered(a, b, rendered):
+    """True if the same text is printed twice in the same place (faux bold), or, on a
+    rendered page, one is text lying entirely within the other, a widget (its own
+    value) or an image (a scan's text layer).
+    """
+    if a == b:
+        return True
+    if not rendered:
+        return False
+    for text, box in ((a, b), (b, a)):
+        if text[0] == "text" and box[0] in ("widget", "image"):
+            if text[1] >= box[1] - TOLERANCE and text[3] <= box[3] + TOLERANCE \
+                    and text[2] >= box[2] - TOLERANCE and text[4] <= box[4] + TOLERANCE:
+                return True
+    return False
+
+
+def off_page(items, width, height, tolerance=TOLERANCE):
+    return [item for item in items
+            if item[1] < -tolerance or item[2] < -tolerance or item[3] > width + tolerance or item[4] > height + tolerance]
+
+
+def _describe(item):
+    kind, x0, y0, x1, y1, label = item
+    return f"{kind} {str(label)!r} at ({x0:.0f}, {y0:.0f}, {x1:.0f}, {y1:.0f})"
+
+
+def check_items(items, width, height, where="", rendered=False) -> list[str]:
+    problems = [f"{where}{_describe(item)} runs off the {width:g} x {height:g} page" for item in off_page(items, width, height)]
+    problems += [f"{where}{_describe(a)} overlaps {_describe(b)} by {dx:.1f} x {dy:.1f} pt"
+                 for a, b, dx, dy in overlaps(items, rendered=rendered)]
+    return problems
+
+
+def check_layout(layout, width=page_width, height=page_height, name="") -> list[str]:
+    """Problems in a compiled layout (compile_layout()), one string each."""
+    prefix = f"{name} " if name else ""
+    problems = []
+    for number, ops in enumerate(layout, 1):
+        problems += check_items(op_items(ops), width, height, f"{prefix}page {number}: ")
+    return problems
+
+
+def check_document(doc: pymupdf.Document, name="") -> list[str]:
+    """Problems on the rendered pages of doc."""
+    prefix = f"{name} " if name else ""
+    problems = []
+    for page in doc:
+        problems += check_items(page_items(page), page.rect.width, page.rect.height, f"{prefix}page {page.number + 1}: ",
+                                rendered=True)
+    return problems
+
+
+def check_pdf(path: str) -> list[str]:
+    """Worker: check_document() for one file."""
+    with pymupdf.open(path) as doc:
+        return check_document(doc, path)
+
+
+def form_specs():
+    """(name, spec, width, height) for every form the generators build."""
+    import gen_application
+    import gen_financial_aid_form
+    import gen_flier
+    return [
+        ("application", gen_application.application_form, page_width, page_height),
+        ("financial_aid", gen_financial_aid_form.financial_aid_form, page_width, page_height),
+        ("flier", gen_flier.flier_spec(), gen_flier.page_width, gen_flier.page_height),
+    ]
+
+
+def variant_specs(path):
+    import gen_flier
+    with open(path) as f:
+        variants = json.load(f)
+    return [(gen_flier.variant_name(variant, i), gen_flier.flier_spec(**variant), gen_flier.page_width, gen_flier.page_height)
+            for i, variant in enumerate(variants, 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check forms for overlapping or off-page items.")
+    parser.add_argument("pdfs", nargs="*", help="rendered PDFs or directories of them (default: check the form specs)")
+    parser.add_argument("--variants", help="also check every flier variant in this JSON list")
+    parser.add_argument("--workers", type=int, help="processes for checking PDFs (default: one per CPU)")
+    args = parser.parse_args()
+
+    problems, checked = [], 0
+    if args.pdfs:
+        paths = [pdf for path in args.pdfs for pdf in (find_pdfs(path) if os.path.isdir(path) else [path])]
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            for result in pool.map(check_pdf, paths, chunksize=8):
+                problems += result
+        checked = len(paths)
+    else:
+        specs = form_specs() + (variant_specs(args.variants) if args.variants else [])
+        for name, spec, width, height in specs:
+            problems += check_layout(compile_layout(spec, width, height), width, height, name)
+        checked = len(specs)
+
+    for problem in problems:
+        print(problem)
+    print(f"Checked {checked} layout(s): {len(problems)} problem(s).", file=sys.stderr)
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Images pre-scaled to the size they're drawn at in a PDF.
+
+fit_image() resamples a source image to the target DPI of the rectangle it
+will be placed in (never upscaling) and re-encodes it in the smallest
+sensible format: palette PNG for images with few colours (logos, QR codes),
+JPEG for opaque photos, PNG otherwise.  Results are cached in .cache/assets/
+by (source hash, rectangle, dpi), so the work happens once per placement.
+"""
+
+import hashlib
+import io
+import os
+
+from PIL import Image
+
+cache_dir = ".cache/assets"
+
+DEFAULT_DPI = 200
+JPEG_QUALITY = 88
+
+# (path, mtime, size, width, height, dpi) -> asset path, for repeat calls in one process
+_fitted = {}
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def target_size(image_size, width_pt: float, height_pt: float, dpi: float) -> tuple[int, int]:
+    """Pixel size that fills width_pt x height_pt at dpi, keeping the aspect ratio."""
+    w, h = image_size
+    scale = min(width_pt * dpi / 72 / w, height_pt * dpi / 72 / h, 1.0)
+    return max(1, round(w * scale)), max(1, round(h * scale))
+
+
+def encode(image: Image.Image) -> tuple[bytes, str]:
+    """Return (bytes, extension) in the best-fitting encoding."""
+    buf = io.BytesIO()
+    if image.mode == "1":
+        image.save(buf, "PNG", optimize=True)
+        return buf.getvalue(), "png"
+    has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+    if image.mode == "P" or image.getcolors(256) is not None:
+        image.convert("RGBA" if has_alpha else "RGB").quantize(256).save(buf, "PNG", optimize=True)
+        return buf.getvalue(), "png"
+    if not has_alpha:
+        image.convert("RGB").save(buf, "JPEG", quality=JPEG_QUALITY, optimize=True)
+        return buf.getvalue(), "jpg"
+    image.save(buf, "PNG", optimize=True)
+    return buf.getvalue(), "png"
+
+
+def fit_image(path: str, width_pt: float, height_pt: float, dpi: float = DEFAULT_DPI) -> str:
+    """Path of a copy of the image scaled for a width_pt x height_pt rectangle."""
+    stat = os.stat(path)
+    memo = (path, stat.st_mtime_ns, stat.st_size, width_pt, height_pt, dpi)
+    if memo in _fitted:
+        return _fitted[memo]
+
+    key = hashlib.sha256(f"{file_sha256(path)}|{width_pt:g}x{height_pt:g}|{dpi:g}".encode()).hexdigest()
+    for ext in ("png", "jpg"):
+        cached = os.path.join(cache_dir, f"{key}.{ext}")
+        if os.path.exists(cached):
+            _fitted[memo] = cached
+            return cached
+
+    with Image.open(path) as image:
+        image.load()
+        size = target_size(image.size, width_pt, height_pt, dpi)
+        if size != image.size:
+            # keep bilevel images (QR codes) crisp
+            resample = Image.Resampling.NEAREST if image.mode == "1" else Image.Resampling.LANCZOS
+            image = image.resize(size, resample)
+        data, ext = encode(image)
+
+    source_ext = os.path.splitext(path)[1].lower().lstrip(".").replace("jpeg", "jpg")
+    if source_ext in ("png", "jpg") and len(data) >= stat.st_size:
+        with open(path, "rb") as f:  # already as small as it gets
+            data, ext = f.read(), source_ext
+
+    os.makedirs(cache_dir, exist_ok=True)
+    cached = os.path.join(cache_dir, f"{key}.{ext}")
+    tmp = f"{cached}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, cached)
+    _fitted[memo] = cached
+    return cached
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""Cached font metrics and text measurement shared by the PDF generators."""
+
+from functools import lru_cache
+
+import pymupdf
+
+
+@lru_cache(maxsize=None)
+def get_font(fontname: str) -> pymupdf.Font:
+    """Return the one Font object kept per face."""
+    return pymupdf.Font(fontname)
+
+
+@lru_cache(maxsize=256)
+def line_height(fontname: str, fontsize: float) -> float:
+    font = get_font(fontname)
+    return (font.ascender - font.descender) * fontsize  # ascender/descender are relative to fontsize 1
+
+
+@lru_cache(maxsize=4096)
+def text_length(text: str, fontname: str, fontsize: float) -> float:
+    return pymupdf.get_text_length(text, fontname=fontname, fontsize=fontsize)
+
+
+def text_lengths(texts, fontname: str, fontsize: float) -> list[float]:
+    """Measure a whole list of labels in one call (e.g. to align a column)."""
+    return [text_length(text, fontname, fontsize) for text in texts]
+
+
+def cache_stats() -> dict[str, dict[str, int]]:
+    stats = {}
+    for name, fn in (("fonts", get_font), ("line_heights", line_height), ("text_lengths", text_length)):
+        info = fn.cache_info()
+        stats[name] = {"hits": info.hits, "misses": info.misses, "size": info.currsize}
+    return stats
+
+
+def stats_summary() -> str:
+    return ", ".join(f"{name} {s['hits']} hits / {s['misses']} misses" for name, s in cache_stats().items())
+
+
+def clear_caches():
+    for fn in (get_font, line_height, text_length):
+        fn.cache_clear()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""Save profiles shared by the PDF generators.
+
+    archive      lossless and conservative: unused objects dropped, content
+                 streams cleaned and deflated, fonts left whole
+    email-small  smallest attachment: fonts subset, duplicate objects merged,
+                 images and fonts deflated, objects packed into object streams
+    web-fast     for downloads: compact and compressed, linearized where the
+                 installed MuPDF still supports it (1.26 dropped linearization)
+
+save_pdf() returns a SaveReport with the size a plain doc.save() would have
+produced, the size actually written and how long the save took.
+
+Output is reproducible: creation and modification dates are dropped and the
+trailer /ID is derived from the inputs (or, without inputs, from the content),
+so the same inputs always give the same bytes.  A file whose bytes haven't
+changed is not rewritten.  Given `inputs`, save_pdf() also writes a sidecar
+manifest, <output>.manifest.json, recording the input hash and output hash;
+is_current() uses it to skip rendering an output that is already up to date.
+"""
+
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass
+
+import pymupdf
+
+DEFAULT_PROFILE = "archive"
+
+PROFILES = {
+    "archive": {"garbage": 3, "deflate": True, "clean": True},
+    "email-small": {
+        "garbage": 4, "deflate": True, "deflate_images": True, "deflate_fonts": True,
+        "use_objstms": 1, "clean": True,
+    },
+    "web-fast": {"garbage": 3, "deflate": True, "clean": True, "linear": True},
+}
+
+# profiles that subset embedded fonts before saving (a no-op for the Base-14 fonts)
+SUBSET_FONTS = {"email-small"}
+
+MANIFEST_SUFFIX = ".manifest.json"
+
+
+@dataclass
+class SaveReport:
+    path: str
+    profile: str
+    plain_bytes: int | None  # None when not measured
+    bytes: int
+    seconds: float
+    linearized: bool = False
+    sha256: str = ""
+    written: bool = True  # False when the file already held these bytes
+
+    def __str__(self):
+        size = f"{self.bytes:,} bytes"
+        if self.plain_bytes:
+            size = f"{self.plain_bytes:,} -> {size} ({self.bytes / self.plain_bytes:.0%})"
+        note = ", linearized" if self.linearized else ""
+        if not self.written:
+            note += ", unchanged"
+        return f"{self.profile}: {size} in {self.seconds * 1000:.0f} ms{note}"
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def file_inputs(paths) -> dict[str, str]:
+    """{path: sha256} for files an output is built from, for save_pdf(inputs=...)."""
+    return {os.path.relpath(path).replace(os.sep, "/"): file_sha256(path) for path in paths}
+
+
+def input_hash(inputs: dict, profile: str) -> str:
+    """Hash of everything that determines an output's bytes."""
+    key = {"inputs": inputs, "profile": profile, "pymupdf": pymupdf.VersionBind}
+    return hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def manifest_path(path: str) -> str:
+    return path + MANIFEST_SUFFIX
+
+
+def read_manifest(path: str) -> dict | None:
+    try:
+        with open(manifest_path(path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_current(path: str, inputs: dict, profile: str = DEFAULT_PROFILE) -> bool:
+    """True if path was written from these inputs and hasn't been touched since."""
+    manifest = read_manifest(path)
+    if not manifest or manifest.get("input_sha256") != input_hash(inputs, profile):
+        return False
+    try:
+        return os.path.getsize(path) == manifest["bytes"] and file_sha256(path) == manifest["output_sha256"]
+    except OSError:
+        return False
+
+
+def save_pdf(doc: pymupdf.Document, path: str, profile: str = DEFAULT_PROFILE, measure: bool = True,
+             inputs: dict | None = None) -> SaveReport:
+    """Save doc to path with the named profile.
+
+    measure=False skips serializing the document a second time to find its
+    plain size; batch workers use that.  inputs (JSON-able, e.g. from
+    file_inputs() plus any other parameters) seed the document ID and are
+    recorded in the output's manifest.
+    """
+    options = dict(PROFILES[profile], no_new_id=True)
+    plain = doc.tobytes(no_new_id=True) if measure or inputs is None else None
+
+    start = time.perf_counter()
+    metadata = doc.metadata
+    if metadata.get("creationDate") or metadata.get("modDate"):
+        doc.set_metadata({**metadata, "creationDate": "", "modDate": ""})
+    seed = input_hash(inputs, profile) if inputs is not None else hashlib.sha256(plain).hexdigest()
+    doc.xref_set_key(-1, "ID", f"[<{seed[:32]}> <{seed[:32]}>]")
+    if profile in SUBSET_FONTS:
+        doc.subset_fonts()
+    linear = options.pop("linear", False)
+    if linear:
+        try:
+            data = doc.tobytes(linear=True, **options)
+        except pymupdf.mupdf.FzErrorArgument:  # "Linearisation is no longer supported"
+            linear = False
+    if not linear:
+        data = doc.tobytes(**options)
+    sha = hashlib.sha256(data).hexdigest()
+    written = not (os.path.exists(path) and os.path.getsize(path) == len(data) and file_sha256(path) == sha)
+    if written:
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    seconds = time.perf_counter() - start
+
+    if inputs is not None:
+        write_manifest(path, {
+            "output": os.path.basename(path), "output_sha256": sha, "bytes": len(data),
+            "input_sha256": seed, "profile": profile, "pymupdf": pymupdf.VersionBind, "inputs": inputs,
+        })
+    return SaveReport(path, profile, len(plain) if measure else None, len(data), seconds, linear, sha, written)
+
+
+def write_manifest(path: str, manifest: dict):
+    text = json.dumps(manifest, indent=2, sort_keys=True, default=str) + "\n"
+    target = manifest_path(path)
+    try:
+        with open(target) as f:
+            if f.read() == text:
+                return
+    except OSError:
+        pass
+    with open(target, "w") as f:
+        f.write(text)
+
+
+def add_profile_argument(parser):
+    parser.add_argument("--profile", default=DEFAULT_PROFILE, choices=sorted(PROFILES),
+                        help="PDF save profile (default: %(default)s)")
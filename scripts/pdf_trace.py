@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""Opt-in tracing of the drawing primitives the PDF generators spend time in.
+
+Run any generator under the tracer:
+
+    python scripts/pdf_trace.py --output trace.json scripts/gen_application.py --roster scholars.csv
+
+enable() wraps the hot pymupdf calls (insert_text, draw_line, add_widget,
+insert_textbox, insert_image, save, ...), text measurement, layout
+compilation and image fitting.  Every call is recorded with its duration;
+at exit a summary table goes to stderr and a Chrome trace (open it in
+chrome://tracing or https://ui.perfetto.dev) is written.  Worker processes
+forked from a traced process record too, and their events are merged in.
+
+Nothing is patched unless tracing is enabled, so normal runs pay nothing.
+Times are inclusive: a traced call that makes other traced calls counts
+their time as well.
+"""
+
+import argparse
+import atexit
+import functools
+import glob
+import importlib
+import json
+import os
+import runpy
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from multiprocessing import util
+
+import pymupdf
+
+# (owner, attribute, category); owners given as strings are modules imported on enable()
+TRACED = [
+    (pymupdf.Page, "insert_text", "draw"),
+    (pymupdf.Page, "draw_line", "draw"),
+    (pymupdf.Page, "insert_textbox", "draw"),
+    (pymupdf.Page, "add_widget", "widget"),
+    (pymupdf.Page, "insert_image", "image"),
+    (pymupdf.Page, "show_pdf_page", "draw"),
+    (pymupdf.Widget, "update", "widget"),
+    (pymupdf.Document, "new_page", "document"),
+    (pymupdf.Document, "save", "save"),
+    (pymupdf.Document, "tobytes", "save"),
+    (pymupdf, "get_text_length", "measure"),
+    ("form_layout", "compile_layout", "layout"),
+    ("form_layout", "fit_image", "image"),  # patched where it's called from
+]
+
+_events = []
+_originals = []
+_output = None
+_pid = None
+
+
+def _record(name, category, start_ns, end_ns):
+    global _pid
+    if os.getpid() != _pid:
+        # first event in a forked worker: start its own log and flush it when the worker exits
+        _pid = os.getpid()
+        _events.clear()
+        util.Finalize(None, _flush_part, exitpriority=0)
+    _events.append((name, category, start_ns // 1000, (end_ns - start_ns) // 1000, threading.get_ident()))
+
+
+def _wrap(name, category, fn):
+    @functools.wraps(fn)
+    def traced(*args, **kwargs):
+        start = time.perf_counter_ns()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _record(name, category, start, time.perf_counter_ns())
+    return traced
+
+
+@contextmanager
+def span(name, category="phase"):
+    """Record a block of code as one event; free when tracing is off."""
+    if not _originals:
+        yield
+        return
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        _record(name, category, start, time.perf_counter_ns())
+
+
+def enable(output=None):
+    """Start tracing; with an output path, write the trace and print a summary at exit."""
+    global _output, _pid
+    if _originals:
+        return
+    _pid = os.getpid()
+    _output = output
+    for owner, attribute, category in TRACED:
+        if isinstance(owner, str):
+            try:
+                owner = importlib.import_module(owner)
+            except ImportError:
+                continue
+        fn = getattr(owner, attribute)
+        name = f"{owner.__name__ if isinstance(owner, type) else fn.__module__}.{attribute}"
+        _originals.append((owner, attribute, fn))
+        setattr(owner, attribute, _wrap(name, category, fn))
+    if output:
+        atexit.register(_finish)
+
+
+def disable():
+    while _originals:
+        owner, attribute, fn = _originals.pop()
+        setattr(owner, attribute, fn)
+
+
+def events():
+    return list(_events)
+
+
+def summary(evts=None):
+    """Per-operation rows: (name, calls, total ms, mean us, max us), slowest total first."""
+    totals = {}
+    for name, _, _, dur, *_ in (_events if evts is None else evts):
+        calls, total, longest = totals.get(name, (0, 0, 0))
+        totals[name] = (calls + 1, total + dur, max(longest, dur))
+    rows = [(name, calls, total / 1000, total / calls, longest) for name, (calls, total, longest) in totals.items()]
+    return sorted(rows, key=lambda row: -row[2])
+
+
+def format_summary(rows):
+    lines = [f"{'operation':<32}{'calls':>8}{'total ms':>11}{'mean us':>10}{'max us':>10}"]
+    for name, calls, total_ms, mean_us, max_us in rows:
+        lines.append(f"{name:<32}{calls:>8}{total_ms:>11.1f}{mean_us:>10.1f}{max_us:>10}")
+    return "\n".join(lines)
+
+
+def chrome_trace(evts):
+    """Complete ("X") events from (name, category, ts, dur, tid, pid) tuples."""
+    return [
+        {"name": name, "cat": category, "ph": "X", "ts": ts, "dur": dur, "pid": pid, "tid": tid}
+        for name, category, ts, dur, tid, pid in evts
+    ]
+
+
+def _part_path(pid):
+    return f"{_output}.{pid}.part"
+
+
+def _flush_part():
+    if _output:
+        with open(_part_path(os.getpid()), "w") as f:
+            json.dump([(*event, os.getpid()) for event in _events], f)
+
+
+def _finish():
+    disable()
+    merged = [(*event, _pid) for event in _events]
+    for part in glob.glob(glob.escape(_output) + ".*.part"):
+        with open(part) as f:
+            merged.extend(tuple(event) for event in json.load(f))
+        os.remove(part)
+    with open(_output, "w") as f:
+        json.dump({"traceEvents": chrome_trace(merged), "displayTimeUnit": "ms"}, f)
+    print(format_summary(summary(merged)), file=sys.stderr)
+    print(f"Trace of {len(merged)} call(s) written to {_output}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a generator script with tracing enabled.")
+    parser.add_argument("--output", "-o", default="trace.json", help="Chrome trace JSON to write (default: %(default)s)")
+    parser.add_argument("script", help="script to run, e.g. scripts/gen_flier.py")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="arguments for the script")
+    args = parser.parse_args()
+
+    sys.argv = [args.script, *args.args]
+    sys.path.insert(0, os.path.dirname(os.path.abspath(args.script)))
+    enable(os.path.abspath(args.output))
+    runpy.run_path(args.script, run_name="__main__")
+
+
+if __name__ == "__main__":
+    main()
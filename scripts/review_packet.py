@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""Merge applicants' documents into one committee review packet.
+
+    python scripts/review_packet.py submissions/ --output packet.pdf
+    python scripts/review_packet.py submissions/ --output packet.pdf --flatten
+
+submissions/ holds one directory per applicant with their PDFs: the
+application form, the financial aid certification and anything supporting.
+Within an applicant, the application comes first, then the certification,
+then the rest by file name.  The packet opens with a generated table of
+contents (linked to each applicant) and carries a bookmark per applicant and
+per document.  --flatten bakes filled-in form fields into the page content so
+they can't be edited.
+
+Documents are streamed in: each source is opened, copied with insert_pdf()
+and closed, and every --chunk applicants the packet is appended to disk with
+an incremental save and reopened, so memory stays bounded by one chunk no
+matter how many applicants there are.  Rerunning with the same output only
+appends applicants that aren't in it yet; the sidecar <output>.json records
+who is in the packet and from which files, and is rewritten after every
+chunk, so a run that stops part way leaves the two in step.  --rebuild
+starts over.  Sources that can't be read are skipped and reported.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import pymupdf
+
+from ingest_forms import FORM_TYPES, file_sha256
+from pdf_metrics import text_length
+
+# document kind -> (bookmark title, position within an applicant)
+DOCUMENT_KINDS = {
+    "application": ("Application", 0),
+    "financial_aid": ("Financial aid certification", 1),
+    None: (None, 2),  # supporting documents are titled by file name
+}
+
+page_width, page_height = 612, 792  # US Letter, like the IRS filings
+margin = 54
+title_fontsize = 16
+row_fontsize = 10
+row_height = 16
+
+
+def find_applicants(input_dir: str) -> list[tuple[str, list[str]]]:
+    """(applicant directory name, [PDF paths]) for every applicant under input_dir, by name."""
+    applicants = []
+    for name in sorted(os.listdir(input_dir)):
+        path = os.path.join(input_dir, name)
+        if not os.path.isdir(path) or name.startswith("."):
+            continue
+        pdfs = [os.path.join(path, f) for f in sorted(os.listdir(path)) if f.lower().endswith(".pdf")]
+        if pdfs:
+            applicants.append((name, pdfs))
+    return applicants
+
+
+def document_kind(doc: pymupdf.Document) -> str | None:
+    names = {widget.field_name for page in doc for widget in page.widgets()}
+    for form_type, schema in FORM_TYPES.items():
+        if schema["marker"] in names:
+            return form_type
+    return None
+
+
+def applicant_label(doc: pymupdf.Document, default: str) -> str:
+    """The name typed into an application form, or default."""
+    for page in doc:
+        for widget in page.widgets():
+            if widget.field_name == "fullname_field" and str(widget.field_value or "").strip():
+                return str(widget.field_value).strip()
+    return default
+
+
+def append_applicant(packet: pymupdf.Document, key: str, paths: list[str], flatten: bool,
+                     contents_pages: int) -> dict | None:
+    """Copy one applicant's PDFs onto the end of packet; returns their manifest entry.
+
+    Each document's "start" is its first page counted from the end of the
+    contents pages, so it survives the contents being regenerated.  Files
+    that aren't readable PDFs are left out and listed under "skipped"; an
+    applicant with no readable file isn't added at all (None).
+    """
+    documents, skipped = [], {}
+    for path in paths:
+        try:
+            with pymupdf.open(path) as src:
+                kind = document_kind(src)
+                documents.append({"file": path, "sha256": file_sha256(path), "kind": kind, "pages": len(src)})
+        except (RuntimeError, ValueError) as e:  # not a readable PDF
+            print(f"Skipping {path}: {e}", file=sys.stderr)
+            skipped[path] = file_sha256(path)
+    if not documents:
+        return None
+    documents.sort(key=lambda d: (DOCUMENT_KINDS[d["kind"]][1], os.path.basename(d["file"])))
+
+    label = key
+    for document in documents:
+        with pymupdf.open(document["file"]) as src:
+            if document["kind"] == "application":
+                label = applicant_label(src, label)
+            if flatten:
+                src.bake(annots=False, widgets=True)
+            document["start"] = len(packet) - contents_pages
+            packet.insert_pdf(src)
+        document["title"] = DOCUMENT_KINDS[document["kind"]][0] or os.path.splitext(os.path.basename(document["file"]))[0]
+    return {"key": key, "label": label, "documents": documents, "skipped": skipped}
+
+
+def contents_rows_per_page() -> int:
+    return int((page_height - 2 * margin - 40) // row_height)
+
+
+def write_contents(packet: pymupdf.Document, applicants: list[dict], title: str) -> int:
+    """Insert the table of contents pages at the front; returns how many there are."""
+    per_page = contents_rows_per_page()
+    pages = max(1, -(-len(applicants) // per_page))
+    for n in range(pages):
+        page = packet.new_page(n, width=page_width, height=page_height)
+        page.insert_text((margin, margin + title_fontsize), title if n == 0 else f"{title} (continued)",
+                         fontname="Helvetica-Bold", fontsize=title_fontsize)
+        y = margin + 40
+        for i, applicant in enumerate(applicants[n * per_page:(n + 1) * per_page], n * per_page + 1):
+            target = pages + applicant["documents"][0]["start"]
+            number = str(target + 1)
+            page.insert_text((margin, y + row_fontsize), f"{i}. {applicant['label']}", fontname="Helvetica", fontsize=row_fontsize)
+            x = page_width - margin - text_length(number, "Helvetica", row_fontsize)
+            page.insert_text((x, y + row_fontsize), number, fontname="Helvetica", fontsize=row_fontsize)
+            page.insert_link({"kind": pymupdf.LINK_GOTO, "page": target,
+                              "from": pymupdf.Rect(margin, y, page_width - margin, y + row_height)})
+            y += row_height
+    return pages
+
+
+def bookmarks(applicants: list[dict], contents_pages: int) -> list[list]:
+    toc = [[1, "Contents", 1]]
+    for applicant in applicants:
+        documents = applicant["documents"]
+        toc.append([1, applicant["label"], contents_pages + documents[0]["start"] + 1])
+        toc.extend([2, d["title"], contents_pages + d["start"] + 1] for d in documents)
+    return toc
+
+
+def read_manifest(path: str) -> dict | None:
+    try:
+        with open(path + ".json") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_manifest(path: str, manifest: dict):
+    tmp = f"{path}.json.tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+        f.write("\n")
+    os.replace(tmp, path + ".json")
+
+
+def source_files(applicant: dict) -> dict[str, str]:
+    """{path: sha256} of every file an applicant's entry was built from, skipped ones included."""
+    return {**{d["file"]: d["sha256"] for d in applicant["documents"]}, **applicant.get("skipped", {})}
+
+
+def build_packet(input_dir: str, output: str, title: str = "Committee review packet", flatten: bool = False,
+                 chunk: int = 25, rebuild: bool = False) -> dict:
+    """Append the applicants under input_dir that output doesn't have yet; returns the manifest."""
+    manifest = None if rebuild else read_manifest(output)
+    if manifest and (not os.path.exists(output) or manifest.get("flatten") != flatten):
+        print(f"{output} doesn't match its manifest (or --flatten changed); rebuilding", file=sys.stderr)
+        manifest = None
+    fresh = manifest is None
+    if fresh:
+        # the packet always starts with its contents pages; a fresh one gets a placeholder
+        with pymupdf.open() as packet:
+            packet.new_page(width=page_width, height=page_height)
+            packet.save(output)
+        manifest = {"title": title, "flatten": flatten, "contents_pages": 1, "contents_current": False, "applicants": []}
+
+    present = {applicant["key"]: applicant for applicant in manifest["applicants"]}
+    new = []
+    for key, paths in find_applicants(input_dir):
+        if key not in present:
+            new.append((key, paths))
+        elif source_files(present[key]) != {p: file_sha256(p) for p in paths}:
+            print(f"{key}: documents changed since the packet was built; use --rebuild to pick them up", file=sys.stderr)
+
+    # reopening the packet for every chunk drops the pages already written from memory;
+    # the manifest is saved with each chunk so it always lists every page in the file
+    added = 0
+    for start in range(0, len(new), chunk):
+        packet = pymupdf.open(output)
+        for key, paths in new[start:start + chunk]:
+            applicant = append_applicant(packet, key, paths, flatten, manifest["contents_pages"])
+            if applicant is None:
+                print(f"{key}: no readable documents; not added", file=sys.stderr)
+                continue
+            manifest["applicants"].append(applicant)
+            added += 1
+            print("Added", applicant["label"], f"({sum(d['pages'] for d in applicant['documents'])} pages)")
+        packet.saveIncr()
+        packet.close()
+        manifest["contents_current"] = False
+        write_manifest(output, manifest)
+
+    # also catches up on a run that stopped before its contents were written
+    if not manifest.get("contents_current", True):
+        packet = pymupdf.open(output)
+        packet.delete_pages(range(manifest["contents_pages"]))
+        manifest["contents_pages"] = write_contents(packet, manifest["applicants"], manifest["title"])
+        packet.set_toc(bookmarks(manifest["applicants"], manifest["contents_pages"]))
+        packet.saveIncr()
+        packet.close()
+        manifest["contents_current"] = True
+    write_manifest(output, manifest)
+    return {**manifest, "added": added}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge applicants' documents into one review packet.")
+    parser.add_argument("input_dir", help="one directory of PDFs per applicant")
+    parser.add_argument("--output", "-o", default="review_packet.pdf", help="packet to create or extend (default: %(default)s)")
+    parser.add_argument("--title", default="Committee review packet", help="heading of the contents page")
+    parser.add_argument("--flatten", action="store_true", help="bake form fields into the pages")
+    parser.add_argument("--chunk", type=int, default=25, help="applicants per incremental save (default: %(default)s)")
+    parser.add_argument("--rebuild", action="store_true", help="start a new packet instead of appending")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    manifest = build_packet(args.input_dir, args.output, args.title, args.flatten, args.chunk, args.rebuild)
+    pages = manifest["contents_pages"] + sum(d["pages"] for a in manifest["applicants"] for d in a["documents"])
+    print(f"{args.output}: {len(manifest['applicants'])} applicant(s), {pages} page(s); "
+          f"added {manifest['added']} in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
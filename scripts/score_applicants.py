@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""Score and rank applicants for the selection committee.
+
+Reads the tables written by ingest_forms.py, joins each application to the
+applicant's financial aid certification by name, and scores everyone under
+one or more weight sets:
+
+    python scripts/score_applicants.py --output ranked.csv
+    python scripts/score_applicants.py --weights weights.json --perturb 200 --output ranked.csv
+
+weights.json maps scenario names to criterion weights, e.g.
+
+    {"base": {"gpa": 0.3, "need_gap": 0.4, "sai": 0.2, "fulltime": 0.1},
+     "need-heavy": {"gpa": 0.1, "need_gap": 0.6, "sai": 0.3}}
+
+Criteria are scaled to 0..1 across the applicant pool (SAI inverted, so a
+lower SAI scores higher) and a missing value scores 0.  All scenarios are
+scored at once as one matrix product, so thousands of applicants under
+hundreds of weight sets take milliseconds.  The first scenario orders the
+sheet; the others feed the sensitivity columns (best / median / worst rank
+and how often each applicant lands in the top N).
+"""
+
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from ingest_forms import load_table
+
+# criterion -> True if higher is better
+CRITERIA = {
+    "gpa": True,
+    "need_gap": True,
+    "need_ratio": True,
+    "sai": False,
+    "cost": True,
+    "fulltime": True,
+}
+
+DEFAULT_WEIGHTS = {"base": {"gpa": 0.3, "need_gap": 0.4, "sai": 0.2, "fulltime": 0.1}}
+
+COST_PARTS = ["tuition_fees", "books", "room_board", "other_costs"]
+
+SHEET_COLUMNS = [
+    "full_name", "email", "program", "school", "gpa", "sai", "cost", "need_gap", "need_ratio", "fulltime",
+]
+
+
+def name_key(names: pd.Series) -> pd.Series:
+    return names.astype("string").str.casefold().str.replace(r"[\W_]+", " ", regex=True).str.strip()
+
+
+def latest(df: pd.DataFrame, key: pd.Series) -> pd.DataFrame:
+    """Keep the most recently ingested row per key."""
+    return df.assign(key=key).sort_values("ingested_at").drop_duplicates("key", keep="last")
+
+
+def load_applicants(data_dir: str = "data/forms") -> pd.DataFrame:
+    """One row per applicant: the latest application joined to the latest financial aid form."""
+    applications = load_table(data_dir, "application")
+    aid = load_table(data_dir, "financial_aid")
+    if applications is None:
+        raise FileNotFoundError(f"no application table under {data_dir}; run ingest_forms.py first")
+    applications = latest(applications, name_key(applications["full_name"]))
+    if aid is None:
+        aid = pd.DataFrame(columns=["key", "student_name", "school", "sai", "gpa", "cost_of_attendance", *COST_PARTS])
+    else:
+        aid = latest(aid, name_key(aid["student_name"]))
+    aid = aid[["key", "student_name", "school", "sai", "gpa", "cost_of_attendance", *COST_PARTS]]
+    return applications.merge(aid, on="key", how="left").reset_index(drop=True)
+
+
+def add_metrics(df: pd.DataFrame) -> pd.DataFrame:
+    """Derived columns: cost, need_gap (cost - SAI, floored at 0; missing without an SAI), need_ratio and fulltime."""
+    df = df.copy()
+    parts = df[COST_PARTS].astype("Float64").sum(axis=1, min_count=1)
+    df["cost"] = df["cost_of_attendance"].astype("Float64").fillna(parts)
+    sai = df["sai"].astype("Float64")
+    df["need_gap"] = (df["cost"] - sai).clip(lower=0)
+    df["need_ratio"] = (df["need_gap"] / df["cost"].where(df["cost"] > 0)).clip(0, 1)
+    fulltime = df[["planned_fulltime", "current_fulltime", "applying_fulltime"]].astype("boolean").fillna(False)
+    df["fulltime"] = fulltime.any(axis=1)
+    return df
+
+
+def criteria_matrix(df: pd.DataFrame, criteria) -> np.ndarray:
+    """n x k array of criteria scaled to 0..1 (1 = best); missing values are 0."""
+    x = df[list(criteria)].astype("float64")
+    lo, hi = x.min(), x.max()
+    scaled = ((x - lo) / (hi - lo).where(hi > lo, 1.0)).to_numpy()
+    higher_better = np.array([CRITERIA[c] for c in criteria])
+    scaled = np.where(higher_better, scaled, 1.0 - scaled)
+    return np.nan_to_num(scaled, nan=0.0)
+
+
+def weight_matrix(weight_sets: dict[str, dict[str, float]], criteria) -> np.ndarray:
+    """k x m array, one normalized column per scenario."""
+    w = np.array([[weights.get(c, 0.0) for weights in weight_sets.values()] for c in criteria], dtype=float)
+    totals = w.sum(axis=0)
+    if (totals <= 0).any():
+        raise ValueError("every weight set needs a positive total weight")
+    return w / totals
+
+
+def perturbed(weights: dict[str, float], n: int, spread: float, seed: int = 0) -> dict[str, dict[str, float]]:
+    """n random variations of a weight set, each weight scaled by up to +/- spread."""
+    rng = np.random.default_rng(seed)
+    names = list(weights)
+    base = np.array([weights[c] for c in names])
+    factors = rng.uniform(1 - spread, 1 + spread, size=(n, len(names)))
+    return {f"perturb-{i + 1}": dict(zip(names, row)) for i, row in enumerate(base * factors)}
+
+
+def ranks(scores: np.ndarray) -> np.ndarray:
+    """Rank (1 = best) of every row within each column; ties keep row order."""
+    order = np.argsort(-scores, axis=0, kind="stable")
+    r = np.empty_like(order)
+    np.put_along_axis(r, order, np.arange(1, scores.shape[0] + 1)[:, None], axis=0)
+    return r
+
+
+def score(df: pd.DataFrame, weight_sets: dict[str, dict[str, float]], top: int = 10) -> pd.DataFrame:
+    """Return the ranked sheet for df (with metrics) under every weight set."""
+    criteria = [c for c in CRITERIA if any(weights.get(c) for weights in weight_sets.values())]
+    unknown = {c for weights in weight_sets.values() for c in weights} - set(CRITERIA)
+    if unknown:
+        raise ValueError(f"unknown criteria {sorted(unknown)}; choose from {list(CRITERIA)}")
+
+    scores = criteria_matrix(df, criteria) @ weight_matrix(weight_sets, criteria)  # n x m
+    rank = ranks(scores)
+
+    sheet = df[[c for c in SHEET_COLUMNS if c in df]].copy()
+    names = list(weight_sets)
+    sheet["score"] = scores[:, 0]
+    sheet["rank"] = rank[:, 0]
+    if len(names) > 1:
+        sheet["best_rank"] = rank.min(axis=1)
+        sheet["median_rank"] = np.median(rank, axis=1)
+        sheet["worst_rank"] = rank.max(axis=1)
+        sheet[f"top{top}_share"] = (rank <= top).mean(axis=1)
+        for i, name in enumerate(names[1:], 1):
+            if i > 20:  # the summary columns stand in for large sweeps
+                break
+            sheet[f"rank[{name}]"] = rank[:, i]
+    return sheet.sort_values("rank").reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score and rank applicants from the ingested form tables.")
+    parser.add_argument("--data-dir", default="data/forms", help="ingest_forms.py output (default: %(default)s)")
+    parser.add_argument("--weights", help="JSON file of named weight sets (default: a built-in base set)")
+    parser.add_argument("--perturb", type=int, default=0, help="add N random variations of the first weight set")
+    parser.add_argument("--spread", type=float, default=0.25, help="relative size of those variations (default: %(default)s)")
+    parser.add_argument("--top", type=int, default=10, help="N for the top-N share column (default: %(default)s)")
+    parser.add_argument("--output", help="write the ranked sheet here (.csv or .parquet); default: print it")
+    args = parser.parse_args()
+
+    weight_sets = DEFAULT_WEIGHTS
+    if args.weights:
+        with open(args.weights) as f:
+            weight_sets = json.load(f)
+    if args.perturb:
+        weight_sets = {**weight_sets, **perturbed(next(iter(weight_sets.values())), args.perturb, args.spread)}
+
+    try:
+        df = add_metrics(load_applicants(args.data_dir))
+    except FileNotFoundError as e:
+        sys.exit(str(e))
+    start = time.perf_counter()
+    sheet = score(df, weight_sets, args.top)
+    elapsed = time.perf_counter() - start
+
+    if args.output and args.output.endswith(".parquet"):
+        sheet.to_parquet(args.output, index=False)
+    elif args.output:
+        sheet.to_csv(args.output, index=False)
+    else:
+        print(sheet.head(50).to_string(index=False))
+    print(f"Scored {len(sheet)} applicant(s) under {len(weight_sets)} weight set(s) in {elapsed * 1000:.1f} ms"
+          + (f"; wrote {args.output}" if args.output else ""), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
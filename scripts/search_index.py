@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""Full-text and field-value search over submitted forms and the IRS filings.
+
+    python scripts/search_index.py index returned/ docs/irsforms/
+    python scripts/search_index.py search "nurse practitioner"
+    python scripts/search_index.py search "State University" --field school
+    python scripts/search_index.py search "excise tax" --path irsforms
+
+`index` extracts every PDF's page text and widget values in worker
+processes and stores them in an SQLite FTS5 index (data/search.sqlite by
+default, git-ignored with the rest of data/).  Re-indexing is incremental:
+a file whose size and mtime are unchanged is not opened, one whose content
+hash is unchanged is not re-extracted, and files that have disappeared from
+the indexed directories are dropped.
+
+`search` takes an FTS5 query (words, "phrases", prefix*, AND / OR / NOT) and
+prints each matching document, page and field.  Widgets of the known forms
+are indexed under their ingest_forms.py column names (full_name, program,
+school, ...); other widgets under their own names, and page text with no
+field name.
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import pymupdf
+
+from ingest_forms import FORM_TYPES, file_sha256, find_pdfs
+
+DEFAULT_DB = "data/search.sqlite"
+
+# widget name -> column name, for every known form
+FIELD_NAMES = {name: column for schema in FORM_TYPES.values() for name, (column, _) in schema["columns"].items()}
+
+
+def connect(path: str = DEFAULT_DB) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    db = sqlite3.connect(path)
+    db.executescript("""
+        CREATE TABLE IF NOT EXISTS files (
+            path TEXT PRIMARY KEY,
+            sha256 TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            pages INTEGER NOT NULL,
+            indexed_at TEXT NOT NULL,
+            first_entry INTEGER NOT NULL,  -- the file's entries are rowids first_entry..last_entry
+            last_entry INTEGER NOT NULL
+        );
+        -- one row per page of text and per filled-in widget; field is '' for page text
+        CREATE VIRTUAL TABLE IF NOT EXISTS entries USING fts5(
+            text, field UNINDEXED, path UNINDEXED, page UNINDEXED, tokenize = 'porter unicode61'
+        );
+    """)
+    return db
+
+
+def extract_file(path: str) -> tuple[str, str, int, list[tuple[int, str, str]] | None]:
+    """Worker: (path, sha256, page count, [(page, field, text), ...]); entries are None if unreadable."""
+    digest = file_sha256(path)
+    entries = []
+    try:
+        with pymupdf.open(path) as doc:
+            pages = len(doc)
+            for page in doc:
+                text = page.get_text().strip()
+                if text:
+                    entries.append((page.number + 1, "", text))
+                for widget in page.widgets():
+                    value = widget.field_value
+                    if widget.field_type == pymupdf.PDF_WIDGET_TYPE_CHECKBOX:
+                        value = "checked" if value not in (None, "", "Off", False) else ""
+                    value = str(value or "").strip()
+                    if value:
+                        entries.append((page.number + 1, FIELD_NAMES.get(widget.field_name, widget.field_name), value))
+    except (RuntimeError, ValueError) as e:  # not a readable PDF
+        print(f"Skipping {path}: {e}", file=sys.stderr)
+        return path, digest, 0, None
+    return path, digest, pages, entries
+
+
+def drop_entries(db: sqlite3.Connection, path: str):
+    """Delete a file's entries by rowid range (filtering FTS5 on an unindexed column scans it all)."""
+    row = db.execute("SELECT first_entry, last_entry FROM files WHERE path = ?", (path,)).fetchone()
+    if row:
+        db.execute("DELETE FROM entries WHERE rowid BETWEEN ? AND ?", row)
+
+
+def under(path: str, root: str) -> bool:
+    """True if the relative path is root or inside it, compared by path components."""
+    root = os.path.relpath(root)
+    if root == ".":
+        return path != ".." and not path.startswith(os.path.join("..", ""))
+    return os.path.commonpath([root, path]) == root
+
+
+def index(roots: list[str], db_path: str = DEFAULT_DB, workers: int | None = None) -> dict[str, int]:
+    """Bring the index up to date with every PDF under roots; returns counts by outcome."""
+    db = connect(db_path)
+    known = {path: (sha, size, mtime) for path, sha, size, mtime in db.execute("SELECT path, sha256, size, mtime_ns FROM files")}
+    counts = {"indexed": 0, "unchanged": 0, "removed": 0, "unreadable": 0}
+
+    seen, stale = set(), []
+    for root in roots:
+        for path in [root] if os.path.isfile(root) else find_pdfs(root):
+            path = os.path.relpath(path)
+            seen.add(path)
+            stat = os.stat(path)
+            if path in known and known[path][1:] == (stat.st_size, stat.st_mtime_ns):
+                counts["unchanged"] += 1
+            else:
+                stale.append(path)
+
+    # only files whose stat changed are hashed, in the workers along with the extraction
+    now = datetime.now(timezone.utc).isoformat()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for path, digest, pages, entries in pool.map(extract_file, stale, chunksize=8):
+            stat = os.stat(path)
+            if entries is None:
+                counts["unreadable"] += 1
+                continue
+            if path in known and known[path][0] == digest:
+                db.execute("UPDATE files SET size = ?, mtime_ns = ? WHERE path = ?", (stat.st_size, stat.st_mtime_ns, path))
+                counts["unchanged"] += 1
+                continue
+            drop_entries(db, path)
+            first = db.execute("SELECT COALESCE(MAX(rowid), 0) + 1 FROM entries").fetchone()[0]
+            db.executemany("INSERT INTO entries (rowid, text, field, path, page) VALUES (?, ?, ?, ?, ?)",
+                           [(first + i, text, field, path, page) for i, (page, field, text) in enumerate(entries)])
+            db.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                       (path, digest, stat.st_size, stat.st_mtime_ns, pages, now, first, first + len(entries) - 1))
+            counts["indexed"] += 1
+
+    # files under an indexed root that no longer exist
+    for path in known.keys() - seen:
+        if any(under(path, root) for root in roots):
+            drop_entries(db, path)
+            db.execute("DELETE FROM files WHERE path = ?", (path,))
+            counts["removed"] += 1
+    db.commit()
+    db.close()
+    return counts
+
+
+def search(query: str, db_path: str = DEFAULT_DB, field: str | None = None, path: str | None = None,
+           limit: int = 20) -> list[tuple[str, int, str, str]]:
+    """(path, page, field, snippet) for the best matches of an FTS5 query."""
+    sql = "SELECT path, page, field, snippet(entries, 0, '[', ']', '...', 12) FROM entries WHERE entries MATCH ?"
+    params: list = [query]
+    if field is not None:
+        sql += " AND field = ?"
+        params.append(field)
+    if path:
+        sql += " AND path LIKE ?"
+        params.append(f"%{path}%")
+    sql += " ORDER BY rank LIMIT ?"
+    params.append(limit)
+    db = connect(db_path)
+    try:
+        return db.execute(sql, params).fetchall()
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index and search the text and field values of PDFs.")
+    parser.add_argument("--db", default=DEFAULT_DB, help="index file (default: %(default)s)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    index_parser = commands.add_parser("index", help="add new and changed PDFs under the given directories")
+    index_parser.add_argument("roots", nargs="+", help="directories (searched recursively) or PDF files")
+    index_parser.add_argument("--workers", type=int, help="number of worker processes (default: one per CPU)")
+    search_parser = commands.add_parser("search", help="query the index")
+    search_parser.add_argument("query", help='FTS5 query, e.g. program or "State University" or nurs*')
+    search_parser.add_argument("--field", help="only this field (e.g. full_name, program, school; '' for page text)")
+    search_parser.add_argument("--path", help="only documents whose path contains this")
+    search_parser.add_argument("--limit", type=int, default=20, help="max results (default: %(default)s)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == "index":
+        counts = index(args.roots, args.db, args.workers)
+        print(", ".join(f"{name}: {n}" for name, n in counts.items()) + f" in {time.perf_counter() - start:.1f} s")
+        return
+
+    try:
+        results = search(args.query, args.db, args.field, args.path, args.limit)
+    except sqlite3.OperationalError as e:  # FTS5 query syntax
+        sys.exit(f"Bad query {args.query!r}: {e}")
+    for path, page, field, snippet in results:
+        where = f"{path} p.{page}" + (f" {field}" if field else "")
+        print(f"{where}: {' '.join(snippet.split())}")
+    print(f"{len(results)} result(s) in {(time.perf_counter() - start) * 1000:.1f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()